@@ -0,0 +1,269 @@
+from datetime import timedelta
+from itertools import chain
+import numpy as np
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Date, Integer
+from models import db, Employee, Department, Contract, Vacation
+from rollups import average_hours_per_department
+from cache import TTLCache
+import versions
+
+# Таблицы, от которых зависят показатели дашборда
+DASHBOARD_TABLES = ('employees', 'departments', 'contracts', 'vacations', 'work_hours')
+
+dashboard_cache = TTLCache(ttl=60)
+
+# Наибольшая длина периода календаря отсутствий (дней)
+MAX_CALENDAR_DAYS = 3660
+
+
+class timestampdiff(FunctionElement):
+    """
+    Число полных единиц (YEAR, MONTH или DAY) между двумя датами.
+    В MySQL это TIMESTAMPDIFF, для остальных СУБД (SQLite в тестовом
+    окружении) - эквивалентное выражение на strftime.
+    """
+    type = Integer()
+    inherit_cache = True
+
+    def __init__(self, unit, start, end):
+        self.unit = unit
+        super().__init__(start, end)
+
+
+@compiles(timestampdiff, 'mysql')
+def _timestampdiff_mysql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"TIMESTAMPDIFF({element.unit}, {compiler.process(start, **kw)}, {compiler.process(end, **kw)})"
+
+
+@compiles(timestampdiff)
+def _timestampdiff_default(element, compiler, **kw):
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    if element.unit == 'DAY':
+        return f"CAST(julianday({end}) - julianday({start}) AS INTEGER)"
+    years = f"(CAST(strftime('%Y', {end}) AS INTEGER) - CAST(strftime('%Y', {start}) AS INTEGER))"
+    if element.unit == 'YEAR':
+        return f"({years} - (strftime('%m-%d', {end}) < strftime('%m-%d', {start})))"
+    months = f"(CAST(strftime('%m', {end}) AS INTEGER) - CAST(strftime('%m', {start}) AS INTEGER))"
+    return f"({years} * 12 + {months} - (strftime('%d', {end}) < strftime('%d', {start})))"
+
+
+def age_expression():
+    """Полных лет сотруднику на сегодня"""
+    return timestampdiff('YEAR', Employee.date_of_birth, func.current_date())
+
+
+def first_contracts():
+    """Подзапрос: дата начала самого раннего контракта каждого сотрудника"""
+    return db.session.query(
+        Contract.fk_employee.label('employee_id'),
+        func.min(Contract.start_date).label('hired'),
+    ).group_by(Contract.fk_employee).subquery()
+
+
+def tenure_expression(hired):
+    """Стаж в годах (с точностью до месяца) от даты первого контракта"""
+    return timestampdiff('MONTH', hired, func.current_date()) / 12.0
+
+
+# Допустимые значения параметра group_by
+GROUP_BY_OPTIONS = ('department', 'active')
+
+
+def parse_group_by(raw):
+    """Разбирает group_by=department,active"""
+    if not raw:
+        return []
+    groups = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in groups if name not in GROUP_BY_OPTIONS]
+    if unknown:
+        raise ValueError(f"Недопустимая группировка: {', '.join(unknown)}")
+    return groups
+
+
+def _grouped_average(query, value, label, group_by):
+    """
+    Один агрегирующий запрос AVG/COUNT по value с необязательной группировкой.
+    Общее среднее считается как взвешенное по группам, без второго запроса.
+    """
+    columns = []
+    if 'department' in group_by:
+        query = query.outerjoin(Department, Department.department_id == Employee.fk_department)
+        columns += [Employee.fk_department, Department.name]
+    if 'active' in group_by:
+        columns.append(Employee.active)
+
+    rows = query.with_entities(
+        *columns,
+        func.avg(value).label('average'),
+        func.count(value).label('count'),
+    ).group_by(*columns).all()
+
+    total = sum(row.count for row in rows)
+    overall = sum(float(row.average) * row.count for row in rows if row.count) / total if total else 0
+    result = {label: round(overall, 1)}
+    if group_by:
+        groups = []
+        for row in rows:
+            group = {}
+            if 'department' in group_by:
+                group['department_id'] = row.fk_department
+                group['department'] = row.name
+            if 'active' in group_by:
+                group['active'] = row.active
+            group[label] = round(float(row.average), 1) if row.count else 0
+            group['count'] = row.count
+            groups.append(group)
+        result['groups'] = groups
+    return result
+
+
+def average_age(group_by=()):
+    """Средний возраст сотрудников (AVG по TIMESTAMPDIFF в SQL)"""
+    query = db.session.query(Employee).filter(Employee.date_of_birth != None)
+    return _grouped_average(query, age_expression(), 'average_age', group_by)
+
+
+def average_tenure(group_by=()):
+    """Средний стаж сотрудников по дате первого контракта"""
+    hired = first_contracts()
+    query = db.session.query(Employee).join(hired, hired.c.employee_id == Employee.employee_id)
+    return _grouped_average(query, tenure_expression(hired.c.hired), 'average_tenure', group_by)
+
+
+def _employee_stats():
+    """Один запрос: численность, уволенные, возраст и стаж по отделам"""
+    hired = first_contracts()
+    age = age_expression()
+    tenure = tenure_expression(hired.c.hired)
+    return db.session.query(
+        Employee.fk_department,
+        func.count(Employee.employee_id).label('total'),
+        func.sum(case((Employee.active == 'No', 1), else_=0)).label('churned'),
+        func.sum(age).label('age_sum'),
+        func.count(age).label('age_count'),
+        func.sum(tenure).label('tenure_sum'),
+        func.count(hired.c.hired).label('tenure_count'),
+    ).outerjoin(
+        hired, hired.c.employee_id == Employee.employee_id
+    ).group_by(Employee.fk_department).all()
+
+
+def churned_employees():
+    """Запрос уволенных сотрудников (индекс по active)"""
+    return Employee.query.filter_by(active='No')
+
+
+def department_counts():
+    """Запрос численности отделов (пустые отделы с нулем)"""
+    return select(
+        Department.name.label('department'),
+        func.count(Employee.employee_id).label('count'),
+    ).outerjoin(
+        Employee, Department.department_id == Employee.fk_department
+    ).group_by(Department.department_id, Department.name)
+
+
+def _departments():
+    return db.session.query(Department.department_id, Department.name).all()
+
+
+def compute_dashboard():
+    """Все показатели страницы аналитики: агрегаты по сотрудникам и итоги по часам"""
+    stats = _employee_stats()
+    departments = _departments()
+
+    total = sum(row.total for row in stats)
+    churned = sum(row.churned or 0 for row in stats)
+    age_sum = sum(row.age_sum or 0 for row in stats)
+    age_count = sum(row.age_count for row in stats)
+    tenure_sum = sum(row.tenure_sum or 0 for row in stats)
+    tenure_count = sum(row.tenure_count for row in stats)
+
+    counts = {row.fk_department: row.total for row in stats}
+
+    return {
+        'department_count': [{
+            'department': dept.name,
+            'count': counts.get(dept.department_id, 0)
+        } for dept in departments],
+        'average_age': round(float(age_sum) / age_count, 1) if age_count else 0,
+        'churn_rate': round(churned / total * 100, 1) if total else 0,
+        'average_tenure': round(float(tenure_sum) / tenure_count, 1) if tenure_count else 0,
+        'average_hours_per_department': average_hours_per_department(),
+    }
+
+
+def get_dashboard():
+    """Показатели дашборда из кэша; ключ - версии таблиц, от которых они зависят"""
+    key = ('dashboard',) + versions.current(*DASHBOARD_TABLES)
+    return dashboard_cache.get_or_compute(key, compute_dashboard)
+
+
+def _merge_periods(employees, starts, ends, days):
+    """
+    Объединяет пересекающиеся периоды одного сотрудника (две одобренные заявки
+    на одни и те же дни), чтобы день считался один раз на сотрудника.
+    Периоды разных сотрудников разносятся смещением больше длины календаря,
+    после сортировки накопленный максимум окончаний показывает, продолжает ли
+    период предыдущий.
+    """
+    shift = np.unique(employees, return_inverse=True)[1] * (days + 1)
+    order = np.lexsort((starts, shift))
+    starts, ends, shift = starts[order] + shift[order], ends[order] + shift[order], shift[order]
+    reach = np.maximum.accumulate(ends)
+    first = np.ones(len(starts), dtype=bool)
+    first[1:] = starts[1:] > reach[:-1]
+    groups = np.flatnonzero(first)
+    return starts[groups] - shift[groups], np.maximum.reduceat(ends, groups) - shift[groups]
+
+
+def absence_calendar(date_from, date_to, department=None):
+    """
+    Число сотрудников в одобренном отпуске на каждый день [date_from, date_to].
+    Один запрос выбирает пересекающиеся с периодом отпуска (индекс по end_date),
+    пересекающиеся отпуска одного сотрудника объединяются, затем разностный
+    массив: +1 в день начала, -1 после дня окончания, и накопленная сумма дает
+    ряд без цикла по дням каждого отпуска.
+    """
+    days = (date_to - date_from).days + 1
+    # Смещения начала и конца отпуска от date_from считаются в SQL,
+    # чтобы не разбирать даты построчно в Python
+    origin = literal(date_from, Date())
+    query = select(
+        Vacation.fk_employee,
+        timestampdiff('DAY', origin, Vacation.start_date),
+        timestampdiff('DAY', origin, Vacation.end_date),
+    ).where(
+        Vacation.status == 'Approved',
+        Vacation.end_date >= date_from,
+        Vacation.start_date <= date_to,
+    )
+    if department is not None:
+        query = query.join(Employee, Employee.employee_id == Vacation.fk_employee).where(
+            Employee.fk_department == department
+        )
+    rows = db.session.execute(query).tuples().all()
+
+    absent = np.zeros(days, dtype=np.int64)
+    if rows:
+        values = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=3 * len(rows)).reshape(-1, 3)
+        offsets = np.clip(values[:, 1:], 0, days - 1)
+        starts, ends = _merge_periods(values[:, 0], offsets[:, 0], offsets[:, 1], days)
+        delta = np.bincount(starts, minlength=days + 1) - np.bincount(ends + 1, minlength=days + 1)
+        absent = np.cumsum(delta[:days])
+
+    dates = np.arange(np.datetime64(date_from, 'D'), np.datetime64(date_to + timedelta(days=1), 'D'))
+    peak = int(absent.argmax())
+    return {
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'department': department,
+        'vacations': len(rows),
+        'peak': {'date': str(dates[peak]), 'absent': int(absent[peak])},
+        'days': [{'date': day, 'absent': count}
+                 for day, count in zip(dates.astype(str).tolist(), absent.tolist())],
+    }
@@ -0,0 +1,248 @@
+import inspect
+import io
+import os
+import sys
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+from flask import jsonify
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from models import Department, Employee
+from schemas import EMPLOYEE_LIST_FIELDS, departments_schema
+from auth import role_required
+from conditional_get import conditional_async
+from db_pool import engine_options_from_env
+from db_routing import is_sticky
+from pagination import parse_limit, parse_cursor, parse_fields, keyset_query, split_page
+from serializers import (
+    json_response, vacation_serializer, contract_serializer, vacation_rows, contract_rows, employees_list_query,
+)
+from analytics import department_counts
+from app import app
+
+# ASGI-вариант приложения: uvicorn asgi:application --workers 4
+# Списки и аналитика, которые в основном ждут базу, обрабатываются асинхронно
+# через асинхронный драйвер (aiomysql, для SQLite - aiosqlite): пока запрос ждет
+# ответа базы, воркер обслуживает другие. Проверка токена, ETag и метрики
+# выполняются теми же функциями Flask в контексте запроса.
+# Остальные маршруты (запись, выгрузки, хеширование паролей) передаются
+# синхронному приложению Flask через WsgiToAsgi (в пуле потоков).
+
+# Асинхронные драйверы для диалектов синхронного DATABASE_URL
+ASYNC_DRIVERS = {'mysql': 'aiomysql', 'sqlite': 'aiosqlite'}
+
+
+def async_url(url):
+    """URL базы с асинхронным драйвером того же диалекта"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Нет асинхронного драйвера для {backend}")
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def _engine_options(url):
+    options = engine_options_from_env(url)
+    # Для асинхронного движка нужен его собственный пул (AsyncAdaptedQueuePool)
+    options.pop('poolclass', None)
+    if url.get_backend_name() == 'sqlite':
+        options.pop('pool_size', None)
+        options.pop('max_overflow', None)
+    return options
+
+
+_engines = {}
+_sessions = {}
+
+
+def _session_factory(replica):
+    """Асинхронные сессии основной базы или реплики; движок создается в цикле событий воркера"""
+    name = 'replica' if replica else 'primary'
+    if name not in _sessions:
+        url = async_url(os.environ['DATABASE_REPLICA_URL'] if replica else app.config['SQLALCHEMY_DATABASE_URI'])
+        _engines[name] = create_async_engine(url, **_engine_options(url))
+        _sessions[name] = async_sessionmaker(_engines[name], expire_on_commit=False)
+    return _sessions[name]
+
+
+async def fetch_all(statement, scalars=False):
+    """
+    Выполняет SELECT асинхронно. Как и read_replica, читает с реплики, если она
+    настроена и клиент недавно ничего не записывал.
+    """
+    replica = bool(os.environ.get('DATABASE_REPLICA_URL')) and not is_sticky()
+    async with _session_factory(replica)() as session:
+        result = await session.execute(statement)
+        return result.scalars().all() if scalars else result.all()
+
+
+@role_required('hr')
+@conditional_async('employees', fetch_all=fetch_all)
+async def list_employees():
+    """GET /employees без format: страница списка, как в app.get_employees"""
+    try:
+        try:
+            limit = parse_limit()
+            cursor = parse_cursor()
+            fields = parse_fields(EMPLOYEE_LIST_FIELDS)
+            serializer, query = employees_list_query(fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        rows = await fetch_all(keyset_query(query, Employee.employee_id, cursor, limit).statement)
+        rows, next_cursor = split_page(rows, Employee.employee_id, limit)
+
+        response = json_response(serializer.dump(rows))
+        if next_cursor is not None:
+            response.headers['X-Next-Cursor'] = str(next_cursor)
+        return response
+    except Exception as e:
+        print(f"Ошибка при получении списка сотрудников: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@role_required('hr')
+@conditional_async('vacations', 'employees', fetch_all=fetch_all)
+async def list_vacations():
+    try:
+        return json_response(vacation_serializer.dump(await fetch_all(vacation_rows().statement)))
+    except Exception as e:
+        print(f"Ошибка при получении списка отпусков: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@role_required('hr')
+@conditional_async('contracts', 'employees', fetch_all=fetch_all)
+async def list_contracts():
+    try:
+        return json_response(contract_serializer.dump(await fetch_all(contract_rows().statement)))
+    except Exception as e:
+        print(f"Ошибка при получении списка контрактов: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@role_required('any')
+@conditional_async('departments', fetch_all=fetch_all)
+async def list_departments():
+    try:
+        return jsonify(departments_schema.dump(await fetch_all(select(Department), scalars=True)))
+    except Exception as e:
+        print(f"Ошибка при получении списка отделов: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@role_required('hr')
+async def department_count():
+    try:
+        return jsonify([dict(row._mapping) for row in await fetch_all(department_counts())])
+    except Exception as e:
+        print(f"Ошибка при получении статистики по отделам: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+# Асинхронные маршруты (только GET); выгрузки с format= идут в Flask
+ASYNC_ROUTES = {
+    '/employees': list_employees,
+    '/vacations': list_vacations,
+    '/contracts': list_contracts,
+    '/departments': list_departments,
+    '/analytics/department-count': department_count,
+}
+
+
+def _environ(scope):
+    """WSGI environ запроса без тела по ASGI scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0] if client else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope['headers']:
+        name = raw_name.decode('latin1').upper().replace('-', '_')
+        value = raw_value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        environ[name] = f'{environ[name]},{value}' if name in environ else value
+    return environ
+
+
+class HybridApplication:
+    """ASGI-приложение: ASYNC_ROUTES обрабатываются в цикле событий, остальное - через Flask"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        handler = self._async_handler(scope)
+        if handler is None:
+            return await self.wsgi(scope, receive, send)
+        await self._dispatch(handler, scope, send)
+
+    @staticmethod
+    def _async_handler(scope):
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return None
+        if 'format' in parse_qs(scope['query_string'].decode('latin1')):
+            return None
+        return ASYNC_ROUTES.get(scope['path'])
+
+    async def _dispatch(self, handler, scope, send):
+        """Тот же цикл обработки, что Flask.full_dispatch_request: before/after_request, ошибки, teardown"""
+        flask_app = self.flask_app
+        ctx = flask_app.request_context(_environ(scope))
+        error = None
+        ctx.push()
+        try:
+            try:
+                rv = flask_app.preprocess_request()
+                if rv is None:
+                    rv = handler()
+                    if inspect.isawaitable(rv):
+                        rv = await rv
+            except Exception as e:
+                rv = flask_app.handle_user_exception(e)
+            response = flask_app.finalize_request(rv)
+        except Exception as e:
+            error = e
+            response = flask_app.handle_exception(e)
+        finally:
+            ctx.pop(error)
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                        for name, value in response.headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for engine in _engines.values():
+                    await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = HybridApplication(app)
@@ -1,64 +1,97 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, g
 from flask_jwt_extended import (
-    JWTManager, create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request, get_jwt
+    JWTManager, create_access_token, jwt_required, verify_jwt_in_request, get_jwt
 )
-from datetime import timedelta
+import asyncio
+from datetime import datetime, timedelta
 from functools import wraps
+from inspect import iscoroutinefunction
+import logging
+from sqlalchemy import event, inspect
 from models import Employee, db
-import traceback
+from hashing import HashingBusy
+from token_cache import token_cache, revoke_employee_tokens, is_revoked
+from request_metrics import phase
 
 # Создаем блупринт для авторизации
 auth_bp = Blueprint('auth', __name__)
 
+# Отладочные сообщения проверки токена выводятся только при уровне DEBUG
+logger = logging.getLogger(__name__)
+
 # Инициализация JWT (будет выполнена в app.py)
 jwt = JWTManager()
 
+@jwt.token_in_blocklist_loader
+def check_token_revoked(jwt_header, jwt_payload):
+    """Токены деактивированных сотрудников и выданные до смены пароля недействительны"""
+    return is_revoked(jwt_payload)
+
+def register_revocation_listeners(session):
+    """
+    Деактивация и смена пароля отзывают токены сотрудника: tokens_valid_after
+    записывается в той же транзакции, а кэши воркера сбрасываются после commit.
+    Откат транзакции ничего не отзывает.
+    """
+    @event.listens_for(session, 'before_flush')
+    def before_flush(session, flush_context, instances):
+        for obj in session.dirty:
+            if not isinstance(obj, Employee) or obj.employee_id is None:
+                continue
+            state = inspect(obj)
+            active = state.attrs['active'].history
+            deactivated = active.has_changes() and obj.active == 'No' and 'No' not in active.deleted
+            if deactivated or state.attrs['password_hash'].history.has_changes():
+                obj.tokens_valid_after = datetime.now()
+                session.info.setdefault('revoked_employees', set()).add(obj.employee_id)
+
+    @event.listens_for(session, 'after_commit')
+    def after_commit(session):
+        for employee_id in session.info.pop('revoked_employees', ()):
+            revoke_employee_tokens(employee_id)
+
+    @event.listens_for(session, 'after_rollback')
+    def after_rollback(session):
+        session.info.pop('revoked_employees', None)
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Эндпоинт для входа пользователя"""
+    # Тело запроса (пароль), email и токен в журнал не пишутся
     try:
-        print("===== Попытка входа =====")
         data = request.get_json()
-        print(f"Полученные данные: {data}")
         
         if not data:
-            print("Ошибка: Отсутствуют данные для входа")
+            logger.info("Вход: отсутствуют данные для входа")
             return jsonify({"error": "Отсутствуют данные для входа"}), 400
             
         email = data.get('email', '')
         password = data.get('password', '')
-        print(f"Email: {email}")
         
         # Проверка наличия обязательных полей
         if not email or not password:
-            print("Ошибка: Email и пароль обязательны")
+            logger.info("Вход: не указаны email или пароль")
             return jsonify({"error": "Email и пароль обязательны"}), 400
         
         # Поиск сотрудника по email
         employee = Employee.query.filter_by(email=email).first()
-        print(f"Сотрудник найден: {employee is not None}")
         
         if not employee:
-            print(f"Ошибка: Сотрудник с email {email} не найден")
+            logger.info("Вход: сотрудник не найден")
             return jsonify({"error": "Неверный email или пароль"}), 401
             
-        # Проверка пароля
-        password_valid = employee.check_password(password)
-        print(f"Пароль верный: {password_valid}")
-        
         # Если сотрудник не найден или пароль неверный
-        if not password_valid:
-            print("Ошибка: Неверный пароль")
+        if not employee.check_password(password):
+            logger.info("Вход: неверный пароль сотрудника %s", employee.employee_id)
             return jsonify({"error": "Неверный email или пароль"}), 401
             
         # Если сотрудник неактивен
         if employee.active == 'No':
-            print("Ошибка: Учетная запись деактивирована")
+            logger.info("Вход: учетная запись %s деактивирована", employee.employee_id)
             return jsonify({"error": "Учетная запись деактивирована"}), 403
             
         # Используем строку в качестве идентификатора (ID пользователя)
         identity = str(employee.employee_id)
-        print(f"ID для токена: {identity}")
         
         # Дополнительные данные для фронтенда
         additional_claims = {
@@ -72,7 +105,7 @@ def login():
             additional_claims=additional_claims,
             expires_delta=timedelta(days=1)
         )
-        print(f"Токен создан: {access_token[:20]}...")
+        logger.debug("Вход выполнен: sub=%s", identity)
         
         response_data = {
             'access_token': access_token,
@@ -80,54 +113,52 @@ def login():
             'role': employee.role,
             'name': f"{employee.first_name} {employee.last_name}"
         }
-        print(f"Отправляемый ответ: {response_data}")
         
         return jsonify(response_data), 200
         
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
-        print(f"Ошибка входа: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Ошибка входа")
         return jsonify({"error": str(e)}), 500
 
 @auth_bp.route('/set-password/<int:employee_id>', methods=['POST'])
 @jwt_required()
 def set_password(employee_id):
     """Эндпоинт для установки/сброса пароля (только для HR)"""
+    # Тело запроса (новый пароль) в журнал не пишется
     try:
-        print(f"===== Запрос на установку пароля для сотрудника {employee_id} =====")
-        
         # Получаем дополнительные данные из токена
         claims = get_jwt()
         user_role = claims.get('role')
         
         # Проверяем, имеет ли пользователь права HR
         if user_role != 'hr':
-            print(f"Ошибка: Пользователь с ролью {user_role} пытается установить пароль")
+            logger.info("Установка пароля сотрудника %s запрещена для роли %s", employee_id, user_role)
             return jsonify({"error": "Только HR могут устанавливать пароли"}), 403
             
         # Находим сотрудника
         employee = Employee.query.get_or_404(employee_id)
-        print(f"Найден сотрудник: {employee.first_name} {employee.last_name}")
         
         data = request.get_json()
-        print(f"Полученные данные: {data}")
         
         # Проверяем наличие пароля в запросе
         if not data or 'password' not in data or not data['password']:
-            print("Ошибка: Пароль не указан")
+            logger.info("Установка пароля сотрудника %s: пароль не указан", employee_id)
             return jsonify({"error": "Пароль обязателен"}), 400
             
         # Устанавливаем новый пароль
         employee.set_password(data['password'])
-        print(f"Пароль успешно установлен для сотрудника {employee_id}")
         
         db.session.commit()
+        logger.info("Пароль сотрудника %s установлен (sub=%s)", employee_id, claims.get('sub'))
         
         return jsonify({"message": "Пароль успешно установлен"}), 200
         
+    except HashingBusy as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
-        print(f"Ошибка установки пароля: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Ошибка установки пароля сотрудника %s", employee_id)
         return jsonify({"error": str(e)}), 500
 
 @auth_bp.route('/profile', methods=['GET'])
@@ -135,31 +166,18 @@ def set_password(employee_id):
 def get_profile():
     """Возвращает профиль текущего пользователя"""
     try:
-        print("===== Запрос на получение профиля =====")
-        
-        # Проверяем заголовки запроса
-        headers = dict(request.headers)
-        auth_header = headers.get('Authorization', 'Заголовок отсутствует')
-        print(f"Заголовок Authorization: {auth_header}")
-        
-        # Получаем ID пользователя из токена (строка)
-        employee_id = get_jwt_identity()
-        print(f"ID сотрудника из токена: {employee_id}")
-        
-        # Получаем дополнительные данные из токена
-        claims = get_jwt()
-        print(f"Дополнительные данные из токена: {claims}")
+        claims = current_claims()
+        logger.debug("Запрос профиля: sub=%s", claims.get('sub'))
         
         # Преобразуем ID в число
         try:
-            employee_id = int(employee_id)
+            employee_id = int(claims.get('sub'))
         except (ValueError, TypeError):
-            print(f"Ошибка: Недопустимый ID сотрудника: {employee_id}")
+            logger.info("Недопустимый ID сотрудника в токене: %r", claims.get('sub'))
             return jsonify({"error": "Недопустимый токен"}), 401
         
         # Ищем сотрудника в базе данных
         employee = Employee.query.get_or_404(employee_id)
-        print(f"Найден сотрудник: {employee.first_name} {employee.last_name}")
         
         # Формируем ответ
         profile_data = {
@@ -171,68 +189,97 @@ def get_profile():
             'department_id': employee.fk_department,
             'role': employee.role
         }
-        print(f"Отправляемые данные профиля: {profile_data}")
         
         return jsonify(profile_data), 200
         
     except Exception as e:
-        print(f"Ошибка получения профиля: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Ошибка получения профиля")
         return jsonify({"error": str(e)}), 500
 
+def _bearer_token():
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):]
+    return None
+
+def current_claims():
+    """
+    Проверенные claims текущего запроса.
+    Токен проверяется один раз за запрос (результат хранится в g), а уже
+    проверенные токены берутся из token_cache без повторной проверки подписи.
+    """
+    claims = g.get('jwt_claims')
+    if claims is None:
+        token = _bearer_token()
+        claims = token_cache.get(token) if token else None
+        if claims is None or is_revoked(claims):
+            verify_jwt_in_request()
+            claims = get_jwt()
+            if token:
+                token_cache.put(token, claims)
+        g.jwt_claims = claims
+    return claims
+
+def _authorize(role, kwargs):
+    """Проверяет токен и роль текущего запроса; возвращает ответ с ошибкой или None"""
+    try:
+        with phase('auth'):
+            claims = current_claims()
+    except Exception as e:
+        logger.info("JWT не прошел проверку для %s: %s", request.path, e)
+        return jsonify({"error": str(e)}), 422
+
+    # Получаем роль из дополнительных данных
+    user_role = claims.get('role')
+    if not user_role:
+        logger.info("В токене отсутствует роль (%s)", request.path)
+        return jsonify({"error": "Недопустимый токен"}), 401
+
+    # Проверка роли
+    if role != 'any' and user_role != role:
+        logger.info("Доступ запрещен: требуется роль %s, у пользователя %s (%s)",
+                    role, user_role, request.path)
+        return jsonify({"error": "Доступ запрещен"}), 403
+
+    # Для роли 'any' и при наличии employee_id в маршруте
+    # проверяем, что сотрудник имеет доступ только к своим данным
+    if role == 'any' and 'employee_id' in kwargs:
+        employee_id = claims.get('sub')
+        if user_role != 'hr' and int(employee_id) != int(kwargs['employee_id']):
+            logger.info("Доступ к данным другого сотрудника запрещен: %s != %s",
+                        employee_id, kwargs['employee_id'])
+            return jsonify({"error": "Доступ к данным другого сотрудника запрещен"}), 403
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Роль %s подтверждена для %s: sub=%s", role, request.path, claims.get('sub'))
+    return None
+
 # Декоратор для проверки ролей
 def role_required(role):
     """
     Декоратор для проверки роли пользователя.
     Используйте 'hr' для доступа только HR, 'employee' для доступа только сотрудников,
-    и 'any' для доступа обоих типов пользователей с проверкой ID сотрудника
+    и 'any' для доступа обоих типов пользователей с проверкой ID сотрудника.
+    Подходит и для асинхронных обработчиков (asgi.py): проверка токена может
+    прочитать время отзыва из базы, поэтому выполняется в пуле потоков,
+    не останавливая цикл событий.
     """
     def wrapper(fn):
+        if iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_decorator(*args, **kwargs):
+                # to_thread копирует contextvars: request и g доступны в потоке
+                error = await asyncio.to_thread(_authorize, role, kwargs)
+                if error is not None:
+                    return error
+                return await fn(*args, **kwargs)
+            return async_decorator
+
         @wraps(fn)
         def decorator(*args, **kwargs):
-            try:
-                print(f"===== Проверка роли: {role} для эндпоинта {request.path} =====")
-                
-                # Проверяем заголовки запроса
-                headers = dict(request.headers)
-                auth_header = headers.get('Authorization', 'Заголовок отсутствует')
-                print(f"Заголовок Authorization: {auth_header}")
-                
-                verify_jwt_in_request()
-                print("JWT успешно верифицирован")
-                
-                # Получаем ID пользователя из токена
-                employee_id = get_jwt_identity()
-                print(f"ID сотрудника из токена: {employee_id}")
-                
-                # Получаем дополнительные данные из токена
-                claims = get_jwt()
-                print(f"Дополнительные данные из токена: {claims}")
-                
-                # Получаем роль из дополнительных данных
-                user_role = claims.get('role')
-                if not user_role:
-                    print("Ошибка: В токене отсутствует роль")
-                    return jsonify({"error": "Недопустимый токен"}), 401
-                
-                # Проверка роли
-                if role != 'any' and user_role != role:
-                    print(f"Ошибка: Доступ запрещен: требуется роль {role}, но пользователь имеет роль {user_role}")
-                    return jsonify({"error": "Доступ запрещен"}), 403
-                    
-                # Для роли 'any' и при наличии employee_id в маршруте
-                # проверяем, что сотрудник имеет доступ только к своим данным
-                if role == 'any' and 'employee_id' in kwargs:
-                    if user_role != 'hr' and int(employee_id) != int(kwargs['employee_id']):
-                        print(f"Ошибка: Доступ к данным другого сотрудника запрещен: {employee_id} != {kwargs['employee_id']}")
-                        return jsonify({"error": "Доступ к данным другого сотрудника запрещен"}), 403
-                
-                print("Проверка роли успешна, вызов защищенной функции")
-                return fn(*args, **kwargs)
-                
-            except Exception as e:
-                print(f"Ошибка в декораторе role_required: {str(e)}")
-                traceback.print_exc()
-                return jsonify({"error": str(e)}), 422
+            error = _authorize(role, kwargs)
+            if error is not None:
+                return error
+            return fn(*args, **kwargs)
         return decorator
-    return wrapper
\ No newline at end of file
+    return wrapper
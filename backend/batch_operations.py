@@ -0,0 +1,256 @@
+from datetime import datetime
+from sqlalchemy import select, update
+from models import db, Employee, Vacation, Contract
+from token_cache import revoke_employee_tokens
+from vacation_periods import VacationConflict, check_request
+import versions
+
+# Пакет операций HR (POST /batch): смена статусов отпусков, изменение контрактов
+# и деактивация сотрудников в одном запросе и одной транзакции.
+# Однотипные изменения выполняются массовыми UPDATE ... WHERE id IN (...),
+# а не загрузкой и сохранением каждой записи через ORM.
+
+MAX_BATCH_OPERATIONS = 1000
+
+VACATION_STATUSES = ('Approved', 'Rejected', 'Pending')
+CONTRACT_FIELDS = ('fk_employee', 'start_date', 'end_date', 'renewal_notification_date')
+CONTRACT_DATE_FIELDS = ('start_date', 'end_date', 'renewal_notification_date')
+
+
+class OperationError(Exception):
+    """Ошибка отдельной операции пакета"""
+
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.details = details
+
+
+def _parse_date(value, field):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise OperationError(f"Поле {field} должно быть датой в формате ГГГГ-ММ-ДД")
+
+
+def _vacation_status(item):
+    if item.get('status') not in VACATION_STATUSES:
+        raise OperationError("Недопустимый статус")
+    return {'status': item['status']}
+
+
+def _contract_update(item):
+    unknown = [key for key in item if key not in CONTRACT_FIELDS + ('op', 'id')]
+    if unknown:
+        raise OperationError(f"Неизвестные поля: {', '.join(unknown)}")
+    values = {}
+    for field in CONTRACT_DATE_FIELDS:
+        if field in item:
+            values[field] = _parse_date(item[field], field) if item[field] is not None else None
+    if any(field in values and values[field] is None for field in ('start_date', 'end_date')):
+        raise OperationError("Даты начала и окончания контракта обязательны")
+    if 'fk_employee' in item:
+        if not isinstance(item['fk_employee'], int) or isinstance(item['fk_employee'], bool):
+            raise OperationError("Поле fk_employee должно быть числом")
+        values['fk_employee'] = item['fk_employee']
+    if not values:
+        raise OperationError("Нет данных для обновления")
+    return values
+
+
+def _deactivate_employee(item):
+    return {'active': 'No'}
+
+
+# Поддерживаемые операции: имя -> разбор параметров
+OPERATIONS = {
+    'vacation_status': _vacation_status,
+    'contract_update': _contract_update,
+    'deactivate_employee': _deactivate_employee,
+}
+
+
+def parse_operations(body):
+    """
+    Разбирает тело запроса {"operations": [...], "atomic": false}.
+    Возвращает (операции, atomic); операция - словарь с op и id и полями операции.
+    Ошибки тела целиком выбрасываются как ValueError.
+    """
+    if not isinstance(body, dict) or not isinstance(body.get('operations'), list):
+        raise ValueError("Ожидается объект с массивом operations")
+    operations = body['operations']
+    if not operations:
+        raise ValueError("Пакет пуст")
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise ValueError(f"Не более {MAX_BATCH_OPERATIONS} операций в пакете")
+    atomic = body.get('atomic', False)
+    if not isinstance(atomic, bool):
+        raise ValueError("Параметр atomic должен быть true или false")
+    return operations, atomic
+
+
+class _Batch:
+    """Результаты операций по номерам и подготовленные изменения по видам операций"""
+
+    def __init__(self, operations):
+        self.results = [None] * len(operations)
+        self.pending = {op: {} for op in OPERATIONS}
+
+        for index, item in enumerate(operations):
+            op = item.get('op') if isinstance(item, dict) else None
+            target = item.get('id') if isinstance(item, dict) else None
+            self.results[index] = {'index': index, 'op': op, 'id': target}
+            try:
+                if op not in OPERATIONS:
+                    raise OperationError("Неизвестная операция")
+                if not isinstance(target, int) or isinstance(target, bool):
+                    raise OperationError("Поле id должно быть числом")
+                if target in self.pending[op]:
+                    raise OperationError("Повторная операция с этой записью в пакете")
+                self.pending[op][target] = (index, OPERATIONS[op](item))
+            except OperationError as e:
+                self.fail(index, e)
+
+    def fail(self, index, error):
+        self.results[index].update(status='error', error=str(error), **getattr(error, 'details', {}))
+
+    def fail_missing(self, op, found_ids):
+        for target in set(self.pending[op]) - set(found_ids):
+            index, _ = self.pending[op].pop(target)
+            self.fail(index, OperationError("Запись не найдена"))
+
+    def succeed(self, op, targets):
+        for target in targets:
+            self.results[self.pending[op][target][0]]['status'] = 'ok'
+
+    @property
+    def failed(self):
+        return sum(1 for result in self.results if result.get('status') == 'error')
+
+
+def _apply_vacation_statuses(batch):
+    pending = batch.pending['vacation_status']
+    if not pending:
+        return
+    current = db.session.execute(
+        select(Vacation.vacation_id, Vacation.fk_employee, Vacation.start_date, Vacation.end_date, Vacation.status)
+        .where(Vacation.vacation_id.in_(pending))
+    ).all()
+    batch.fail_missing('vacation_status', [row.vacation_id for row in current])
+
+    # Возврат отклоненной заявки в работу проверяется на пересечения и остаток дней,
+    # как в PUT /vacations/<id>. Такие заявки обновляются по одной, чтобы следующая
+    # проверка видела уже возвращенные заявки этого же пакета.
+    reactivated = [row for row in current
+                   if row.status == 'Rejected' and pending[row.vacation_id][1]['status'] != 'Rejected']
+    if reactivated:
+        db.session.execute(
+            select(Employee.employee_id)
+            .where(Employee.employee_id.in_({row.fk_employee for row in reactivated}))
+            .with_for_update()
+        ).all()
+    for row in reactivated:
+        index, values = pending[row.vacation_id]
+        try:
+            check_request(row.fk_employee, row.start_date, row.end_date, exclude_id=row.vacation_id)
+        except VacationConflict as e:
+            pending.pop(row.vacation_id)
+            batch.fail(index, OperationError(str(e), conflicts=[v.vacation_id for v in e.conflicts],
+                                             **({'balance': e.balance} if e.balance else {})))
+            continue
+        db.session.execute(update(Vacation).where(Vacation.vacation_id == row.vacation_id).values(**values))
+    reactivated_ids = {row.vacation_id for row in reactivated}
+
+    # Остальные - один UPDATE ... IN на каждый целевой статус
+    by_status = {}
+    for vacation_id, (_, values) in pending.items():
+        if vacation_id not in reactivated_ids:
+            by_status.setdefault(values['status'], []).append(vacation_id)
+    for status, ids in by_status.items():
+        db.session.execute(update(Vacation).where(Vacation.vacation_id.in_(ids)).values(status=status),
+                           execution_options={'synchronize_session': False})
+    batch.succeed('vacation_status', pending)
+
+
+def _apply_contract_updates(batch):
+    pending = batch.pending['contract_update']
+    if not pending:
+        return
+    current = {row.contract_id: row for row in db.session.execute(
+        select(Contract.contract_id, Contract.start_date, Contract.end_date).where(Contract.contract_id.in_(pending))
+    )}
+    batch.fail_missing('contract_update', current)
+
+    employee_ids = {values['fk_employee'] for _, values in pending.values() if 'fk_employee' in values}
+    existing = set(db.session.scalars(
+        select(Employee.employee_id).where(Employee.employee_id.in_(employee_ids))
+    )) if employee_ids else set()
+
+    rows = []
+    for contract_id, (index, values) in list(pending.items()):
+        start = values.get('start_date', current[contract_id].start_date)
+        end = values.get('end_date', current[contract_id].end_date)
+        if end < start:
+            error = OperationError("Дата окончания раньше даты начала")
+        elif 'fk_employee' in values and values['fk_employee'] not in existing:
+            error = OperationError("Сотрудник не найден")
+        else:
+            rows.append({'contract_id': contract_id, **values})
+            continue
+        pending.pop(contract_id)
+        batch.fail(index, error)
+
+    # Обновление по первичному ключу: executemany, строки с одинаковым набором полей - одним пакетом
+    if rows:
+        db.session.execute(update(Contract), rows)
+    batch.succeed('contract_update', pending)
+
+
+def _apply_deactivations(batch):
+    pending = batch.pending['deactivate_employee']
+    if not pending:
+        return
+    found = db.session.scalars(select(Employee.employee_id).where(Employee.employee_id.in_(pending))).all()
+    batch.fail_missing('deactivate_employee', found)
+    if pending:
+        db.session.execute(update(Employee).where(Employee.employee_id.in_(pending))
+                           .values(active='No', tokens_valid_after=datetime.now()),
+                           execution_options={'synchronize_session': False})
+    batch.succeed('deactivate_employee', pending)
+
+
+def run_batch(operations, atomic=False):
+    """
+    Выполняет операции пакета в одной транзакции и возвращает отчет:
+    результат каждой операции (status ok или error с причиной), число успешных
+    и неуспешных и признак committed.
+    atomic=True - если хотя бы одна операция не прошла, не применяется ни одна.
+    Массовые UPDATE обходят события ORM, поэтому tokens_valid_after деактивированных
+    сотрудников ставится в самом UPDATE, версии таблиц (кэш, ETag) отмечаются
+    здесь явно, а кэши токенов сбрасываются после commit.
+    """
+    batch = _Batch(operations)
+    _apply_vacation_statuses(batch)
+    _apply_contract_updates(batch)
+    _apply_deactivations(batch)
+
+    failed = batch.failed
+    committed = not (atomic and failed)
+    if committed:
+        changed = {'vacation_status': 'vacations', 'contract_update': 'contracts', 'deactivate_employee': 'employees'}
+        versions.mark_changed(db.session, *[table for op, table in changed.items() if batch.pending[op]])
+        db.session.commit()
+        for employee_id in batch.pending['deactivate_employee']:
+            revoke_employee_tokens(employee_id)
+    else:
+        db.session.rollback()
+        for result in batch.results:
+            if result.get('status') == 'ok':
+                result['status'] = 'rolled_back'
+
+    return {
+        'atomic': atomic,
+        'committed': committed,
+        'succeeded': len(batch.results) - failed if committed else 0,
+        'failed': failed,
+        'results': batch.results,
+    }
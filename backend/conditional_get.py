@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, g, request
+import versions
+
+
+def _validators(tables, table_versions, changed_at):
+    """Слабый ETag и время последнего изменения для текущего запроса"""
+    # Один и тот же URL отдает разные данные разным пользователям
+    claims = g.get('jwt_claims') or {}
+    scope = hashlib.blake2b(f"{request.full_path}|{claims.get('sub')}".encode(),
+                            digest_size=6).hexdigest()
+    etag = f"{'.'.join(map(str, table_versions))}-{scope}"
+    return etag, datetime.fromtimestamp(changed_at, tz=timezone.utc)
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    # Браузер хранит ответ, но каждый раз перепроверяет его запросом с If-None-Match
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Authorization')
+    return response
+
+
+def conditional(*tables):
+    """
+    Условный GET для маршрутов, данные которых зависят только от таблиц tables.
+    Если у клиента актуальная версия, возвращается 304: один запрос версий из
+    data_versions вместо выборки и сериализации. Ставится после role_required
+    (нужен пользователь из токена) и после read_replica (версии читаются оттуда же, что и данные).
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            etag, last_modified = _validators(tables, *versions.snapshot(*tables))
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+                return _set_validators(response, etag, last_modified)
+            response = current_app.make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return decorator
+    return wrapper
+
+
+def conditional_async(*tables, fetch_all):
+    """
+    Вариант conditional для асинхронных обработчиков (asgi.py): версии читаются
+    асинхронной функцией fetch_all из той же базы, что и данные
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        async def decorator(*args, **kwargs):
+            rows = await fetch_all(versions.snapshot_statement(*tables))
+            etag, last_modified = _validators(tables, *versions.from_rows(rows, tables))
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+                return _set_validators(response, etag, last_modified)
+            response = current_app.make_response(await fn(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return decorator
+    return wrapper
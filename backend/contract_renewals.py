@@ -0,0 +1,112 @@
+import logging
+import re
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import select, union
+from sqlalchemy.dialects import mysql, sqlite
+from models import db, Contract, ContractNotification
+
+logger = logging.getLogger(__name__)
+
+# Окно по умолчанию: события в ближайшие 30 дней
+DEFAULT_WINDOW_DAYS = 30
+MAX_WINDOW_DAYS = 366
+
+_WINDOW_UNITS = {'d': 1, 'w': 7}
+
+
+def parse_window(raw, default=DEFAULT_WINDOW_DAYS):
+    """Разбирает окно вида 30d, 4w или 30 (дней); выбрасывает ValueError"""
+    if not raw:
+        return default
+    match = re.fullmatch(r'(\d+)([dw]?)', raw.strip().lower())
+    if not match:
+        raise ValueError("Параметр within должен быть вида 30d или 4w")
+    days = int(match.group(1)) * _WINDOW_UNITS.get(match.group(2) or 'd')
+    if not 0 <= days <= MAX_WINDOW_DAYS:
+        raise ValueError(f"Окно не должно превышать {MAX_WINDOW_DAYS} дней")
+    return days
+
+
+def due_contract_ids(today, days):
+    """
+    Подзапрос id контрактов, у которых дата уведомления или дата окончания
+    попадает в [today, today + days]. Каждая ветка UNION - диапазон по своему
+    индексу, без просмотра всех контрактов.
+    """
+    until = today + timedelta(days=days)
+    return union(
+        select(Contract.contract_id).where(Contract.renewal_notification_date.between(today, until)),
+        select(Contract.contract_id).where(Contract.end_date.between(today, until)),
+    )
+
+
+def _insert_ignore(dialect):
+    table = ContractNotification.__table__
+    if dialect == 'mysql':
+        return mysql.insert(table).prefix_with('IGNORE')
+    return sqlite.insert(table).on_conflict_do_nothing(index_elements=['fk_contract', 'kind', 'due_date'])
+
+
+def enqueue_notifications(today=None, days=DEFAULT_WINDOW_DAYS):
+    """
+    Добавляет в outbox уведомления о продлении (renewal_notification_date)
+    и окончании (end_date) контрактов с событием в окне.
+    Уникальный ключ (контракт, вид, дата) делает повторный запуск безопасным,
+    в том числе из нескольких процессов одновременно.
+    Возвращает число новых уведомлений.
+    """
+    today = today or datetime.now().date()
+    until = today + timedelta(days=days)
+    rows = []
+    for kind, column in (('renewal', Contract.renewal_notification_date), ('expiry', Contract.end_date)):
+        for contract_id, due_date in db.session.execute(
+            select(Contract.contract_id, column).where(column.between(today, until))
+        ):
+            rows.append({'fk_contract': contract_id, 'kind': kind, 'due_date': due_date})
+    if not rows:
+        return 0
+
+    created_at = datetime.now()
+    for row in rows:
+        row['created_at'] = created_at
+    # Уже поставленные уведомления пропускаются и не входят в rowcount
+    result = db.session.execute(_insert_ignore(db.engine.dialect.name), rows)
+    db.session.commit()
+    return max(result.rowcount, 0)
+
+
+class RenewalScheduler:
+    """
+    Фоновый поток, который раз в interval секунд ставит уведомления в outbox.
+    Альтернатива - команда flask enqueue-contract-notifications из cron.
+    """
+
+    def __init__(self, app, interval, days=DEFAULT_WINDOW_DAYS):
+        self.app = app
+        self.interval = interval
+        self.days = days
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='contract-renewals', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    created = enqueue_notifications(days=self.days)
+                    if created:
+                        logger.info("Поставлено уведомлений по контрактам: %s", created)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Ошибка планировщика уведомлений по контрактам")
+                finally:
+                    db.session.remove()
+            self._stop.wait(self.interval)
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _single_connection_url(url):
+    """SQLite в памяти: одно общее соединение (StaticPool/SingletonThreadPool), пул не настраивается"""
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and (
+        url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+    )
+
+
+def engine_options_from_env(url=None):
+    """
+    Параметры пула соединений SQLAlchemy из переменных окружения.
+    Для SQLite в памяти пул не настраивается - остаются настройки диалекта по умолчанию.
+    """
+    if url is not None and _single_connection_url(url):
+        return {}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        # Переоткрываем соединения раньше, чем MySQL закроет их по wait_timeout
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, который считает время ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.stats = {'checkouts': 0, 'timeouts': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0}
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.stats['timeouts'] += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self.stats['checkouts'] += 1
+            self.stats['wait_seconds_total'] += waited
+            self.stats['wait_seconds_max'] = max(self.stats['wait_seconds_max'], waited)
+        return connection
+
+
+def pool_stats(engines):
+    """Загрузка пулов и время ожидания соединения по каждому движку (bind)"""
+    result = {}
+    for name, engine in engines.items():
+        pool = engine.pool
+        info = {'pool': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            info.update({
+                'size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'checked_out': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'utilization': round(pool.checkedout() / capacity, 3) if capacity else 0,
+            })
+        if isinstance(pool, InstrumentedQueuePool):
+            with pool._stats_lock:
+                stats = dict(pool.stats)
+            checkouts = stats['checkouts']
+            stats['wait_seconds_avg'] = stats['wait_seconds_total'] / checkouts if checkouts else 0.0
+            info.update(stats)
+        result[name or 'default'] = info
+    return result
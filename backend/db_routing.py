@@ -0,0 +1,136 @@
+import time
+from functools import wraps
+from flask import g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Имя bind-а реплики для чтения в SQLALCHEMY_BINDS
+REPLICA_BIND = 'replica'
+
+# Сколько секунд после собственной записи клиент читает с основной базы,
+# чтобы видеть свои изменения несмотря на задержку репликации
+STICKY_SECONDS = 10
+
+# Момент (epoch-секунды), до которого клиент читает с основной базы, передается
+# в cookie: следующий запрос того же клиента может попасть в любой воркер
+STICKY_COOKIE = 'read_primary_until'
+
+
+def mark_sticky():
+    """Направляет чтение текущего клиента на основную базу на STICKY_SECONDS"""
+    if has_request_context():
+        g.read_primary_until = time.time() + STICKY_SECONDS
+
+
+def is_sticky():
+    """Читает ли текущий клиент с основной базы после собственной записи"""
+    if not has_request_context():
+        return False
+    now = time.time()
+    if g.get('read_primary_until', 0) > now:
+        return True
+    try:
+        until = float(request.cookies.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return False
+    # Значение из cookie задает клиент: дальше чем на STICKY_SECONDS оно не действует
+    return now < until <= now + STICKY_SECONDS
+
+
+def register_sticky_cookie(app):
+    """Ставит cookie чтения с основной базы в ответ на запрос, который что-то записал"""
+    @app.after_request
+    def set_sticky_cookie(response):
+        until = g.get('read_primary_until')
+        if until is not None:
+            response.set_cookie(STICKY_COOKIE, f'{until:.3f}', max_age=STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+class RoutingSession(Session):
+    """
+    Сессия, которая отправляет SELECT-запросы на реплику, если маршрут
+    помечен декоратором read_replica и реплика настроена.
+    Flush и любые изменяющие запросы всегда идут на основную базу,
+    а после собственной записи клиент какое-то время читает с основной.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause):
+        if self._flushing or not has_app_context() or not g.get('use_replica'):
+            return False
+        if REPLICA_BIND not in self._db.engines:
+            return False
+        if is_sticky():
+            return False
+        return getattr(clause, 'is_select', False)
+
+
+def register_routing_listeners(session):
+    """Отмечает клиентов, записавших данные, для чтения с основной базы"""
+    @event.listens_for(session, 'after_flush')
+    def after_flush(session, flush_context):
+        session.info['wrote'] = True
+
+    @event.listens_for(session, 'do_orm_execute')
+    def do_orm_execute(orm_execute_state):
+        if not orm_execute_state.is_select:
+            orm_execute_state.session.info['wrote'] = True
+
+    @event.listens_for(session, 'after_commit')
+    def after_commit(session):
+        if session.info.pop('wrote', False):
+            mark_sticky()
+
+    @event.listens_for(session, 'after_rollback')
+    def after_rollback(session):
+        session.info.pop('wrote', None)
+
+
+def read_replica(fn):
+    """Помечает маршрут как только читающий: его запросы выполняются на реплике"""
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        g.use_replica = True
+        return fn(*args, **kwargs)
+    return decorator
+
+
+def check_read_routing(app, primary, replica, employee_id, original_phone, headers, count_queries):
+    """
+    Проверка маршрутизации на двух базах (например, двух файлах SQLite):
+    чтение идет на реплику, запись - на основную базу, чтение сразу после
+    записи - снова на основную. Временно меняет телефон сотрудника employee_id
+    и затем восстанавливает original_phone.
+    Возвращает список (шаг, успех, запросов к основной базе, запросов к реплике).
+    """
+    # Новый клиент - без cookie чтения с основной базы от прошлых запросов
+    client = app.test_client()
+    results = []
+
+    def step(name, method, path, expect, **kwargs):
+        with count_queries(primary) as on_primary, count_queries(replica) as on_replica:
+            response = client.open(path, method=method, headers=headers, **kwargs)
+            response.get_data()
+        counts = (on_primary.count, on_replica.count)
+        if expect == 'replica':
+            routed = counts[1] > 0 and counts[0] == 0
+        else:
+            routed = counts[0] > 0 and counts[1] == 0
+        results.append((name, response.status_code == 200 and routed, *counts))
+
+    # Время отзыва токенов читается с основной базы и кэшируется - прогрев до замеров
+    client.get('/auth/profile', headers=headers)
+    try:
+        step('чтение списка идет на реплику', 'GET', '/employees?limit=1', 'replica')
+        step('запись идет на основную базу', 'PUT', f'/employees/{employee_id}', 'primary',
+             json={'phone': 'routing-check'})
+        step('чтение после записи идет на основную базу', 'GET', '/employees?limit=1', 'primary')
+    finally:
+        client.put(f'/employees/{employee_id}', headers=headers, json={'phone': original_phone})
+    return results
@@ -0,0 +1,143 @@
+import csv
+import io
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from models import db, Employee
+from hashing import hash_passwords
+import versions
+
+REQUIRED_FIELDS = ('first_name', 'last_name', 'email', 'job_name')
+
+# Колонки, которые можно передать при создании сотрудника
+EMPLOYEE_INPUT_FIELDS = tuple(
+    column.key for column in Employee.__table__.columns
+    if column.key not in ('employee_id', 'password_hash', 'tokens_valid_after')
+)
+
+# Сколько сотрудников вставляется в одной транзакции
+IMPORT_CHUNK_SIZE = 500
+
+
+def normalize_employee_data(data):
+    """
+    Проверяет и преобразует данные нового сотрудника.
+    Возвращает (данные без пароля, пароль); при ошибке выбрасывает ValueError.
+    """
+    if not data or not all(data.get(key) is not None for key in REQUIRED_FIELDS):
+        raise ValueError("Отсутствуют обязательные поля")
+
+    data = dict(data)
+
+    if 'salary' in data and data['salary'] is not None:
+        data['salary'] = float(data['salary'])
+
+    if 'date_of_birth' in data and data['date_of_birth'] is not None:
+        data['date_of_birth'] = datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date()
+
+    if 'role' in data:
+        if data['role'] not in ['hr', 'employee']:
+            raise ValueError("Недопустимая роль")
+    else:
+        data['role'] = 'employee'
+
+    password = data.pop('password', None)
+    return data, password
+
+
+def read_import_rows(req):
+    """Читает список сотрудников из JSON-массива или CSV в теле запроса"""
+    if req.mimetype == 'text/csv':
+        reader = csv.DictReader(io.StringIO(req.get_data(as_text=True)))
+        # Пустые ячейки CSV считаем отсутствующими значениями
+        return [{key: (value or None) for key, value in row.items()} for row in reader]
+    rows = req.get_json(silent=True)
+    if not isinstance(rows, list):
+        raise ValueError("Ожидается JSON-массив сотрудников или CSV")
+    return rows
+
+
+def _insert_chunk(chunk):
+    """
+    Вставляет порцию одной транзакцией; при конфликте - построчно, чтобы найти виновника.
+    Вставка через Core минует события ORM, поэтому версия employees
+    (кэш аналитики, ETag списков) отмечается здесь явно и увеличивается при commit.
+    """
+    try:
+        db.session.execute(insert(Employee), [values for _, values in chunk])
+        versions.mark_changed(db.session, 'employees')
+        db.session.commit()
+        return []
+    except IntegrityError:
+        db.session.rollback()
+
+    errors = []
+    for index, values in chunk:
+        try:
+            db.session.execute(insert(Employee), [values])
+            versions.mark_changed(db.session, 'employees')
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            errors.append({'row': index, 'email': values.get('email'), 'error': str(e.orig)})
+    return errors
+
+
+def import_employees(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Массовое создание сотрудников.
+    Проверка уникальности email - один запрос IN (...), пароли хешируются
+    параллельно в пуле процессов, вставка - executemany порциями по chunk_size.
+    Возвращает отчет: число созданных и список ошибок по строкам.
+    """
+    errors = []
+    prepared = []
+    seen_emails = set()
+
+    for index, raw in enumerate(rows):
+        try:
+            if not isinstance(raw, dict):
+                raise ValueError("Строка должна быть объектом")
+            unknown = [key for key in raw if key not in EMPLOYEE_INPUT_FIELDS and key != 'password']
+            if unknown:
+                raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+            data, password = normalize_employee_data(raw)
+            if data['email'] in seen_emails:
+                raise ValueError("Email повторяется в загружаемых данных")
+            seen_emails.add(data['email'])
+            prepared.append((index, data, password))
+        except (ValueError, TypeError) as e:
+            errors.append({'row': index, 'email': raw.get('email') if isinstance(raw, dict) else None,
+                           'error': str(e)})
+
+    # Уникальность email - одним запросом для всей загрузки
+    existing = set()
+    if prepared:
+        existing = {email for (email,) in db.session.query(Employee.email).filter(
+            Employee.email.in_([data['email'] for _, data, _ in prepared])
+        )}
+
+    pending = []
+    for index, data, password in prepared:
+        if data['email'] in existing:
+            errors.append({'row': index, 'email': data['email'],
+                           'error': "Сотрудник с таким email уже существует"})
+        else:
+            pending.append((index, data, password))
+
+    # По умолчанию временный пароль - email, как и в POST /employees
+    hashes = hash_passwords([password or data['email'] for _, data, password in pending])
+
+    created = 0
+    for start in range(0, len(pending), chunk_size):
+        chunk = [
+            (index, dict(data, password_hash=password_hash))
+            for (index, data, _), password_hash in zip(pending[start:start + chunk_size],
+                                                        hashes[start:start + chunk_size])
+        ]
+        chunk_errors = _insert_chunk(chunk)
+        errors.extend(chunk_errors)
+        created += len(chunk) - len(chunk_errors)
+
+    errors.sort(key=lambda error: error['row'])
+    return {'created': created, 'failed': len(errors), 'errors': errors}
@@ -0,0 +1,273 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import event, select
+from models import db, Employee, SyncTombstone
+
+# Поиск сотрудников по префиксам слов (typeahead): индекс в памяти процесса.
+# Слова имени, фамилии, email и должности хранятся в отсортированном списке,
+# поиск префикса - бинарный, без обращения к базе. Индекс строится при первом
+# поиске, обновляется при записи сотрудников через ORM в этом процессе, а изменения
+# других воркеров и массовых UPDATE/INSERT подтягиваются по updated_at и отметкам
+# об удалении не реже раза в REFRESH_SECONDS.
+
+REFRESH_SECONDS = 5
+# Запас при дочитывании изменений: транзакция, получившая updated_at раньше,
+# могла закоммититься позже предыдущего обновления индекса
+REFRESH_SAFETY_SECONDS = 5
+
+MAX_QUERY_TERMS = 5
+
+# Короткий префикс (с, ив) или частое имя находит тысячи сотрудников - такие
+# результаты (от PREFIX_CACHE_MIN_MATCHES) кэшируются вместе с порядком выдачи
+# и сбрасываются при изменении подходящих слов
+PREFIX_CACHE_SIZE = 64
+PREFIX_CACHE_MIN_MATCHES = 500
+
+# Поля ответа (хранятся в индексе) и веса полей при ранжировании
+RESULT_FIELDS = ('employee_id', 'first_name', 'last_name', 'email', 'job_name', 'fk_department', 'active',
+                 'gender', 'salary')
+FIELD_WEIGHTS = {'last_name': 4.0, 'first_name': 3.0, 'email': 2.0, 'job_name': 1.0}
+
+_WORD = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Регистр и ё/е не различаются (Ёлкин = елкин)"""
+    return text.casefold().replace('ё', 'е')
+
+
+def tokenize(text):
+    return _WORD.findall(normalize(text)) if text else []
+
+
+def _field_words(row, field):
+    value = row.get(field)
+    if field == 'email' and value:
+        # Домен у всех один и тот же - индексируется только имя ящика
+        value = value.split('@')[0]
+    return tokenize(value)
+
+
+def _result_values(row):
+    """
+    Поля ответа из строки. Зарплата хранится строкой с копейками, как в /employees
+    (DECIMAL(8, 2)): orjson не сериализует Decimal, а из ORM может прийти и float
+    """
+    values = {field: row.get(field) for field in RESULT_FIELDS}
+    if values['salary'] is not None:
+        values['salary'] = f"{Decimal(str(values['salary'])):.2f}"
+    return values
+
+
+class _Matches(dict):
+    """Закэшированный результат префикса; ranked - отсортированная выдача"""
+    ranked = None
+
+
+class SearchIndex:
+    """Префиксный индекс: слово -> {employee_id: вес лучшего поля}"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._words = []
+        self._postings = {}
+        self._documents = {}
+        self._prefix_cache = OrderedDict()
+        self._refreshed_at = 0.0
+        self._changes_since = None
+
+    @property
+    def built(self):
+        return self._built
+
+    def _invalidate(self, words):
+        if not self._prefix_cache:
+            return
+        for word in words:
+            for length in range(1, len(word) + 1):
+                self._prefix_cache.pop(word[:length], None)
+
+    def _remove(self, employee_id):
+        document = self._documents.pop(employee_id, None)
+        if document is None:
+            return
+        self._invalidate(document['_words'])
+        for word in document['_words']:
+            postings = self._postings[word]
+            postings.pop(employee_id, None)
+            if not postings:
+                del self._postings[word]
+                del self._words[bisect_left(self._words, word)]
+
+    def _add(self, row):
+        employee_id = row['employee_id']
+        values = _result_values(row)
+        document = self._documents.get(employee_id)
+        if document is not None and all(document[field] == values[field] for field in RESULT_FIELDS):
+            return
+        self._remove(employee_id)
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for word in _field_words(row, field):
+                weights[word] = max(weights.get(word, 0.0), weight)
+        for word, weight in weights.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                insort(self._words, word)
+            postings[employee_id] = weight
+        self._invalidate(weights)
+        document = values
+        document['_words'] = tuple(weights)
+        # Порядок при равной релевантности: фамилия, имя, id
+        document['_order'] = (normalize(row.get('last_name') or ''), normalize(row.get('first_name') or ''), employee_id)
+        self._documents[employee_id] = document
+
+    def apply(self, rows=(), deleted_ids=()):
+        """Применяет измененные строки (словари с RESULT_FIELDS) и удаления"""
+        with self._lock:
+            if not self._built:
+                return
+            for employee_id in deleted_ids:
+                self._remove(employee_id)
+            for row in rows:
+                self._add(row)
+
+    def _load(self, since=None):
+        columns = [getattr(Employee, field) for field in RESULT_FIELDS]
+        query = select(*columns)
+        deleted = []
+        if since is not None:
+            query = query.where(Employee.updated_at > since)
+            deleted = db.session.scalars(select(SyncTombstone.entity_id).where(
+                SyncTombstone.entity == 'employees', SyncTombstone.deleted_at > since
+            )).all()
+        return [dict(row._mapping) for row in db.session.execute(query)], deleted
+
+    def ensure_fresh(self):
+        """Строит индекс при первом вызове и дочитывает изменения раз в REFRESH_SECONDS"""
+        with self._lock:
+            if self._built and time.monotonic() - self._refreshed_at < REFRESH_SECONDS:
+                return
+            started = datetime.now()
+            rows, deleted = self._load(self._changes_since)
+            if not self._built:
+                self._built = True
+            for employee_id in deleted:
+                self._remove(employee_id)
+            for row in rows:
+                self._add(row)
+            self._changes_since = started - timedelta(seconds=REFRESH_SAFETY_SECONDS)
+            self._refreshed_at = time.monotonic()
+
+    def _matches(self, term):
+        """{employee_id: вес} для слов, начинающихся с term; полное совпадение слова весит вдвое больше"""
+        matches = self._prefix_cache.get(term)
+        if matches is not None:
+            self._prefix_cache.move_to_end(term)
+            return matches
+        matches = {}
+        first = bisect_left(self._words, term)
+        last = bisect_left(self._words, term + '\U0010ffff', first)
+        for word in self._words[first:last]:
+            boost = 2.0 if word == term else 1.0
+            for employee_id, weight in self._postings[word].items():
+                score = weight * boost
+                if score > matches.get(employee_id, 0.0):
+                    matches[employee_id] = score
+        if len(matches) >= PREFIX_CACHE_MIN_MATCHES:
+            matches = self._prefix_cache[term] = _Matches(matches)
+            if len(self._prefix_cache) > PREFIX_CACHE_SIZE:
+                self._prefix_cache.popitem(last=False)
+        return matches
+
+    def search(self, query, offset=0, limit=20, active=None, department=None,
+               gender=None, salary_min=None, salary_max=None):
+        """
+        Сотрудники, у которых каждое слово запроса - префикс какого-либо слова
+        имени, фамилии, email или должности. Порядок - по сумме весов совпадений,
+        затем по фамилии и имени. Остальные параметры - фильтры по полям ответа.
+        Возвращает (страница, всего найдено).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        if not terms:
+            return [], 0
+        with self._lock:
+            documents = self._documents
+            # Пересечение начинаем с самого редкого слова запроса
+            per_term = sorted((self._matches(term) for term in terms), key=len)
+            scores = per_term[0]
+            for matches in per_term[1:]:
+                scores = {employee_id: score + matches[employee_id]
+                          for employee_id, score in scores.items() if employee_id in matches}
+
+            ranked = getattr(scores, 'ranked', None)
+            if ranked is None:
+                ranked = [(-score, documents[employee_id]['_order']) for employee_id, score in scores.items()]
+                if isinstance(scores, _Matches):
+                    ranked.sort()
+                    scores.ranked = ranked
+            conditions = _filters(active, department, gender, salary_min, salary_max)
+            if conditions:
+                ranked = [item for item in ranked
+                          if all(condition(documents[item[1][2]]) for condition in conditions)]
+            if isinstance(scores, _Matches):
+                top = ranked[offset:offset + limit]
+            else:
+                # Нужна только первая offset + limit часть: частичная сортировка вместо полной
+                top = heapq.nsmallest(offset + limit, ranked)[offset:]
+            page = [{**{field: documents[order[2]][field] for field in RESULT_FIELDS}, 'score': -score}
+                    for score, order in top]
+        return page, len(ranked)
+
+
+def _filters(active, department, gender, salary_min, salary_max):
+    """Условия на документ индекса для заданных фильтров поиска"""
+    conditions = []
+    if active is not None:
+        conditions.append(lambda document: document['active'] == active)
+    if department is not None:
+        conditions.append(lambda document: document['fk_department'] == department)
+    if gender is not None:
+        conditions.append(lambda document: document['gender'] == gender)
+    if salary_min is not None:
+        conditions.append(lambda document: document['salary'] is not None and float(document['salary']) >= salary_min)
+    if salary_max is not None:
+        conditions.append(lambda document: document['salary'] is not None and float(document['salary']) <= salary_max)
+    return conditions
+
+
+search_index = SearchIndex()
+
+
+def register_search_listeners(session):
+    """Изменения сотрудников через ORM попадают в индекс сразу после commit"""
+    @event.listens_for(session, 'after_flush')
+    def after_flush(session, flush_context):
+        if not search_index.built:
+            return
+        changes = session.info.setdefault('search_changes', {'rows': {}, 'deleted': set()})
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, Employee):
+                changes['rows'][obj.employee_id] = {field: getattr(obj, field) for field in RESULT_FIELDS}
+        for obj in session.deleted:
+            if isinstance(obj, Employee):
+                changes['rows'].pop(obj.employee_id, None)
+                changes['deleted'].add(obj.employee_id)
+
+    @event.listens_for(session, 'after_commit')
+    def after_commit(session):
+        changes = session.info.pop('search_changes', None)
+        if changes:
+            search_index.apply(changes['rows'].values(), changes['deleted'])
+
+    @event.listens_for(session, 'after_rollback')
+    def after_rollback(session):
+        session.info.pop('search_changes', None)
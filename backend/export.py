@@ -0,0 +1,91 @@
+import csv
+import io
+from datetime import datetime
+from flask import Response, request, stream_with_context
+from serializers import dumps
+
+# Количество строк, которое читается из курсора и сериализуется за один шаг
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def requested_export_format():
+    """Возвращает формат выгрузки из ?format= или None для обычного JSON-ответа"""
+    fmt = request.args.get('format')
+    if fmt in (None, '', 'json'):
+        return None
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат: {fmt}")
+    return fmt
+
+
+def _flatten(record, prefix=''):
+    """Разворачивает вложенные объекты (employee) в плоские колонки employee.first_name"""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + '.'))
+        elif isinstance(value, datetime):
+            # Время в том же ISO-формате, что и в JSON
+            flat[name] = value.isoformat()
+        else:
+            flat[name] = value
+    return flat
+
+
+def _iter_chunks(query, chunk_size):
+    """Читает результат запроса порциями через серверный курсор"""
+    chunk = []
+    for row in query.execution_options(stream_results=True).yield_per(chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _ndjson_lines(query, schema, chunk_size):
+    for chunk in _iter_chunks(query, chunk_size):
+        yield b''.join(dumps(item) + b'\n' for item in schema.dump(chunk))
+
+
+def _csv_lines(query, schema, columns, chunk_size):
+    buffer = io.StringIO()
+    writer = None
+    if columns:
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+    for chunk in _iter_chunks(query, chunk_size):
+        items = [_flatten(item) for item in schema.dump(chunk)]
+        if writer is None:
+            # Колонки заранее неизвестны - берем их из первой строки
+            writer = csv.DictWriter(buffer, fieldnames=list(items[0].keys()), extrasaction='ignore')
+            writer.writeheader()
+        writer.writerows(items)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_export(query, schema, fmt, filename, columns=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Потоковая выгрузка результата запроса в NDJSON или CSV.
+    schema - схема marshmallow или RowSerializer (serializers.py) с методом dump.
+    Память ограничена размером порции, а не размером таблицы:
+    строки читаются через yield_per и сериализуются по мере отправки.
+    """
+    if fmt == 'ndjson':
+        body = _ndjson_lines(query, schema, chunk_size)
+    else:
+        body = _csv_lines(query, schema, columns, chunk_size)
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    return response
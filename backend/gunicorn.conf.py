@@ -0,0 +1,40 @@
+import multiprocessing
+import os
+
+# Настройки gunicorn для wsgi:app. Все значения можно переопределить переменными окружения.
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+
+# Воркеры - процессы (обходят GIL для сериализации и проверки токенов),
+# потоки внутри воркера ждут базу. По умолчанию 2 * CPU + 1 воркер по 4 потока.
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+
+# У каждого воркера свой пул соединений: DB_POOL_SIZE + DB_MAX_OVERFLOW должно быть
+# не меньше threads, а workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) - меньше max_connections MySQL.
+# Пул хеширования паролей (HASHING_WORKERS процессов) тоже создается в каждом воркере.
+
+# Несколько воркеров безопасны: состояние, от которого зависит корректность ответов,
+# хранится в базе - версии данных для ETag и кэшей (data_versions), отзыв токенов
+# (employees.tokens_valid_after, кэш в воркере не дольше JWT_REVOCATION_CACHE_SECONDS),
+# привязка чтения к основной базе после записи (cookie read_primary_until).
+# В памяти воркера остаются только: индекс поиска сотрудников (дочитывает изменения
+# других воркеров раз в EMPLOYEE_SEARCH_REFRESH_SECONDS) и метрики запросов -
+# /metrics показывает только обработавший запрос воркер. Для точных метрик
+# запускайте с WEB_WORKERS=1 или собирайте /metrics с каждого воркера отдельно.
+
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Периодический перезапуск воркеров ограничивает рост памяти
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+# Приложение загружается в каждом воркере после fork: пул процессов хеширования,
+# планировщик уведомлений и пулы соединений не должны наследоваться от мастера
+preload_app = False
+
+accesslog = os.environ.get('WEB_ACCESS_LOG', '-')
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
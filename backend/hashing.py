@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Пул процессов для хеширования паролей: PBKDF2/scrypt нагружают CPU
+# и в потоках упираются в GIL, поэтому хеши считаются в отдельных процессах.
+# Число одновременно ожидающих задач ограничено: если очередь заполнена,
+# запрос ждет не дольше queue_timeout и получает HashingBusy (ответ 503).
+_settings = {
+    'workers': os.cpu_count() or 1,
+    'max_queue': 64,
+    'queue_timeout': 5.0,
+}
+_pool = None
+_slots = threading.BoundedSemaphore(_settings['max_queue'])
+_lock = threading.Lock()
+
+_stats = {
+    'in_flight': 0,
+    'max_in_flight': 0,
+    'completed': 0,
+    'rejected': 0,
+    'total_seconds': 0.0,
+    'max_seconds': 0.0,
+}
+
+
+class HashingBusy(Exception):
+    """Очередь хеширования переполнена"""
+
+
+def configure(workers=None, max_queue=None, queue_timeout=None):
+    """
+    Настройка пула из конфигурации приложения.
+    workers=0 отключает пул: хеши считаются в вызывающем потоке.
+    """
+    global _pool, _slots
+    with _lock:
+        if workers is not None:
+            _settings['workers'] = workers
+        if max_queue is not None:
+            _settings['max_queue'] = max_queue
+            _slots = threading.BoundedSemaphore(max_queue)
+        if queue_timeout is not None:
+            _settings['queue_timeout'] = queue_timeout
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+def get_pool():
+    """Пул создается при первом обращении, чтобы не порождать процессы при импорте"""
+    global _pool
+    with _lock:
+        if _pool is None and _settings['workers'] > 0:
+            _pool = ProcessPoolExecutor(max_workers=_settings['workers'])
+        return _pool
+
+
+def _acquire():
+    """Занимает место в очереди или выбрасывает HashingBusy по истечении queue_timeout"""
+    slots = _slots
+    if not slots.acquire(timeout=_settings['queue_timeout']):
+        with _lock:
+            _stats['rejected'] += 1
+        raise HashingBusy("Сервер перегружен, повторите попытку позже")
+    with _lock:
+        _stats['in_flight'] += 1
+        _stats['max_in_flight'] = max(_stats['max_in_flight'], _stats['in_flight'])
+    return slots, time.perf_counter()
+
+
+def _release(slots, started):
+    elapsed = time.perf_counter() - started
+    slots.release()
+    with _lock:
+        _stats['in_flight'] -= 1
+        _stats['completed'] += 1
+        _stats['total_seconds'] += elapsed
+        _stats['max_seconds'] = max(_stats['max_seconds'], elapsed)
+
+
+def _submit(fn, *args):
+    """Ставит fn в пул с учетом ограничения очереди и собирает метрики; возвращает Future"""
+    slots, started = _acquire()
+    pool = get_pool()
+    if pool is None:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            _release(slots, started)
+        return future
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        _release(slots, started)
+        raise
+    future.add_done_callback(lambda _: _release(slots, started))
+    return future
+
+
+def _run(fn, *args):
+    return _submit(fn, *args).result()
+
+
+def generate_hash(password):
+    return _run(generate_password_hash, password)
+
+
+def verify_hash(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+def _hash_chunk(passwords):
+    return [generate_password_hash(password) for password in passwords]
+
+
+def hash_passwords(passwords, chunksize=16):
+    """
+    Хеширует список паролей параллельно, порядок результатов сохраняется.
+    Порции идут через ту же ограниченную очередь, что и одиночные хеши, причем
+    одновременно в пуле не больше порций, чем процессов: массовая загрузка
+    не вытесняет входы пользователей. При переполненной очереди - HashingBusy.
+    """
+    futures = deque()
+    hashes = []
+    window = max(_settings['workers'], 1)
+    try:
+        for start in range(0, len(passwords), chunksize):
+            if len(futures) >= window:
+                hashes.extend(futures.popleft().result())
+            futures.append(_submit(_hash_chunk, passwords[start:start + chunksize]))
+        while futures:
+            hashes.extend(futures.popleft().result())
+    finally:
+        for future in futures:
+            future.cancel()
+    return hashes
+
+
+def hashing_stats():
+    """Глубина очереди и задержки хеширования"""
+    with _lock:
+        stats = dict(_stats)
+        stats['workers'] = _settings['workers']
+        stats['max_queue'] = _settings['max_queue']
+    completed = stats['completed']
+    stats['average_seconds'] = stats['total_seconds'] / completed if completed else 0.0
+    return stats
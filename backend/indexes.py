@@ -0,0 +1,202 @@
+import re
+from datetime import date
+from flask import current_app
+from sqlalchemy import inspect, text
+from models import db, Employee, Vacation, Contract
+from schemas import EMPLOYEE_LIST_FIELDS
+from pagination import DEFAULT_PAGE_SIZE, keyset_query
+from serializers import vacation_rows, contract_rows, employees_list_query
+from vacation_periods import overlapping_query, absent_query
+from contract_renewals import due_contract_ids
+from analytics import churned_employees, department_counts, first_contracts
+from rollups import average_hours_query
+
+
+# Индексы, которые заменены новыми и удаляются после создания замены
+RETIRED_INDEXES = {
+    'work_hours': ('ix_work_hours_employee_date',),
+    'vacations': ('ix_vacations_employee_start',),
+}
+
+
+def _drop_index(engine, table, name):
+    preparer = engine.dialect.identifier_preparer
+    sql = f'DROP INDEX {preparer.quote(name)}'
+    if engine.dialect.name == 'mysql':
+        sql += f' ON {preparer.quote(table)}'
+    with engine.begin() as connection:
+        connection.execute(text(sql))
+
+
+def ensure_columns(engine):
+    """
+    Добавляет в существующие таблицы колонки, объявленные в моделях, которых нет в базе.
+    Колонка добавляется допускающей NULL, затем существующие строки получают
+    значение по умолчанию из модели (для updated_at - текущее время).
+    Возвращает список добавленных колонок вида table.column.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    added = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            with engine.begin() as connection:
+                connection.execute(text(
+                    f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN '
+                    f'{preparer.format_column(column)} {column.type.compile(dialect=engine.dialect)}'
+                ))
+                default = column.default
+                if default is not None and (default.is_callable or default.is_scalar):
+                    value = default.arg(None) if default.is_callable else default.arg
+                    connection.execute(table.update().values({column.name: value}))
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def ensure_indexes(engine):
+    """
+    Создает индексы, объявленные в моделях, которых еще нет в базе,
+    и удаляет замененные (RETIRED_INDEXES).
+    Повторный запуск ничего не меняет. Возвращает имена созданных и удаленных индексов.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created, dropped = [], []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+        # Удаляем после создания замены: внешнему ключу в MySQL нужен индекс
+        for name in RETIRED_INDEXES.get(table.name, ()):
+            if name in existing:
+                _drop_index(engine, table.name, name)
+                dropped.append(name)
+    return created, dropped
+
+
+# Период для запросов с диапазоном дат
+PERIOD_FROM, PERIOD_TO = date(2024, 7, 1), date(2024, 7, 14)
+
+
+def _employees_page(path):
+    """Первая страница /employees с параметрами path, как ее строит get_employees"""
+    with current_app.test_request_context(path):
+        _, query = employees_list_query(EMPLOYEE_LIST_FIELDS)
+    return keyset_query(query, Employee.employee_id, None, DEFAULT_PAGE_SIZE)
+
+
+def _expiring_contracts():
+    """Запрос /contracts/expiring: контракты с уведомлением или окончанием в окне"""
+    return contract_rows().filter(
+        Contract.contract_id.in_(due_contract_ids(PERIOD_FROM, 30))
+    ).order_by(Contract.end_date, Contract.contract_id)
+
+
+# Запросы эндпоинтов, построенные теми же функциями, что и в маршрутах, и индексы,
+# которыми они должны обслуживаться: (описание, ((таблица, индекс), ...), построение запроса).
+# Индекс - имя или PRIMARY для первичного ключа; все строки плана по таблице должны
+# использовать один из ее индексов, и каждый указанный индекс должен встретиться в плане
+INDEX_CHECKS = (
+    ('отпуска сотрудника (/employee-vacations)',
+     (('vacations', 'ix_vacations_employee_period'), ('employees', 'PRIMARY')),
+     lambda: vacation_rows().filter(Vacation.fk_employee == 1)),
+    ('пересечение с отпусками сотрудника (POST /vacations)',
+     (('vacations', 'ix_vacations_employee_period'),),
+     lambda: overlapping_query(1, PERIOD_FROM, PERIOD_TO)),
+    ('кто в отпуске в диапазоне (/vacations/absent)',
+     (('vacations', 'ix_vacations_period'), ('employees', 'PRIMARY')),
+     lambda: absent_query(PERIOD_FROM, PERIOD_TO)),
+    ('уволенные сотрудники (/analytics/churn-rate)',
+     (('employees', 'ix_employees_active_department'),),
+     churned_employees),
+    ('сотрудники отдела (/employees?department=)',
+     (('employees', 'ix_employees_department'),),
+     lambda: _employees_page('/employees?department=1')),
+    ('сотрудник контракта (/contracts)',
+     (('employees', 'PRIMARY'),),
+     contract_rows),
+    ('контракты с уведомлением или окончанием в окне (/contracts/expiring)',
+     (('contracts', ('PRIMARY', 'ix_contracts_renewal_notification_date', 'ix_contracts_end_date')),
+      ('employees', 'PRIMARY')),
+     _expiring_contracts),
+    ('первый контракт сотрудника (/analytics/average-tenure)',
+     (('contracts', 'ix_contracts_employee_start'),),
+     lambda: db.session.query(first_contracts())),
+    ('численность по отделам (/analytics/department-count)',
+     (('employees', 'ix_employees_department'),),
+     department_counts),
+    ('часы по отделам (/analytics/average-hours-per-department)',
+     (('work_hours_monthly', 'ix_work_hours_monthly_period'), ('departments', 'PRIMARY')),
+     average_hours_query),
+    ('часы по отделам за период (/analytics/average-hours-per-department?from=&to=)',
+     (('work_hours_daily', 'ix_work_hours_daily_period'), ('work_hours_monthly', 'ix_work_hours_monthly_period')),
+     lambda: average_hours_query(date(2024, 1, 1), date(2024, 3, 15))),
+)
+
+
+def _uses_indexes(keys, indexes):
+    """Все строки плана по таблице используют ожидаемые индексы, и каждый из них встречается"""
+    return bool(keys) and all(key in indexes for key in keys) and set(indexes) <= set(keys)
+
+
+def _explain_mysql(connection, sql, expected):
+    rows = connection.execute(text('EXPLAIN ' + sql)).mappings().all()
+    plan = [f"{row['table']}: type={row['type']}, key={row['key']}" for row in rows]
+    uses_index = all(
+        _uses_indexes([row['key'] for row in rows if row['table'] == table], indexes)
+        for table, indexes in expected
+    )
+    return uses_index, plan
+
+
+_SQLITE_INDEX = re.compile(r' USING (?:COVERING )?INDEX (\w+)|USING INTEGER (PRIMARY) KEY|USING (PRIMARY) KEY')
+
+
+def _sqlite_key(detail):
+    # AUTOMATIC INDEX SQLite строит во время запроса - объявленный индекс не используется
+    if 'AUTOMATIC' in detail:
+        return None
+    match = _SQLITE_INDEX.search(detail)
+    return next((name for name in match.groups() if name), None) if match else None
+
+
+def _explain_sqlite(connection, sql, expected):
+    rows = connection.execute(text('EXPLAIN QUERY PLAN ' + sql)).all()
+    plan = [row[-1] for row in rows]
+    uses_index = all(
+        _uses_indexes([_sqlite_key(detail) for detail in plan if f' {table} ' in f'{detail} '], indexes)
+        for table, indexes in expected
+    )
+    return uses_index, plan
+
+
+def check_query_plans(engine):
+    """
+    Выполняет EXPLAIN для каждого запроса из INDEX_CHECKS.
+    Возвращает список (описание, использует ли запрос ожидаемый индекс, план).
+    На пустых таблицах оптимизатор MySQL может выбрать полный просмотр,
+    поэтому проверку стоит запускать на базе с реалистичным объемом данных.
+    """
+    explain = _explain_mysql if engine.dialect.name == 'mysql' else _explain_sqlite
+    results = []
+    with engine.connect() as connection:
+        for description, expected, build in INDEX_CHECKS:
+            expected = [(table, indexes if isinstance(indexes, tuple) else (indexes,))
+                        for table, indexes in expected]
+            query = build()
+            statement = getattr(query, 'statement', query).compile(
+                dialect=engine.dialect, compile_kwargs={'literal_binds': True}
+            )
+            uses_index, plan = explain(connection, str(statement), expected)
+            results.append((description, uses_index, plan))
+    return results
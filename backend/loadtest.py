@@ -0,0 +1,522 @@
+import asyncio
+import contextlib
+import http.client
+import io
+import json
+import os
+import random
+import resource
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+import numpy as np
+from sqlalchemy import func, insert
+from werkzeug.serving import make_server
+from models import db, Department, Employee, Vacation, Contract, WorkHour, WorkHourDaily, WorkHourMonthly
+from hashing import generate_hash
+from querycount import count_queries
+import rollups
+import versions
+
+# Нагрузочный прогон всех маршрутов приложения на синтетических данных.
+# bench-seed заполняет базу, bench-run вызывает каждый маршрут через тестовый
+# клиент или локальный WSGI-сервер и сравнивает результат с сохраненной базовой линией.
+
+BENCH_PASSWORD = 'benchmark'
+BENCH_HR_EMAIL = 'hr@benchmark.local'
+BENCH_EMPLOYEE_EMAIL = 'employee@benchmark.local'
+SEED_CHUNK_SIZE = 5000
+
+# Допуск при сравнении с базовой линией и минимальная разница задержки,
+# которая считается регрессией (меньшие колебания - шум измерения)
+DEFAULT_TOLERANCE = 0.2
+LATENCY_NOISE_MS = 1.0
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), SEED_CHUNK_SIZE):
+        db.session.execute(insert(model), rows[start:start + SEED_CHUNK_SIZE])
+    # Core INSERT идет мимо событий ORM: версии таблиц (ETag, кэш дашборда) увеличиваются явно
+    versions.mark_changed(db.session, model.__tablename__)
+
+
+def seed(departments=10, employees=1000, vacations=4, contracts=2, work_days=60, random_seed=42):
+    """
+    Заполняет пустую базу синтетическими данными через модели.
+    vacations и contracts - на сотрудника, work_days - дней отработанных часов
+    на сотрудника. Первый сотрудник - HR, второй - обычный сотрудник; у обоих
+    пароль BENCH_PASSWORD. Возвращает число вставленных строк по таблицам.
+    """
+    rng = random.Random(random_seed)
+    today = date.today()
+    password_hash = generate_hash(BENCH_PASSWORD)
+
+    _insert(Department, [{'department_id': d, 'name': f'Отдел {d}'} for d in range(1, departments + 1)])
+
+    employee_rows = []
+    for e in range(1, employees + 1):
+        employee_rows.append({
+            'employee_id': e,
+            'first_name': rng.choice(('Иван', 'Анна', 'Петр', 'Мария', 'Олег', 'Елена')),
+            'last_name': f'Сотрудник{e}',
+            'date_of_birth': date(1960 + rng.randrange(40), rng.randrange(1, 13), rng.randrange(1, 29)),
+            'gender': rng.choice(('male', 'female')),
+            'email': {1: BENCH_HR_EMAIL, 2: BENCH_EMPLOYEE_EMAIL}.get(e, f'employee{e}@benchmark.local'),
+            'phone': f'+7900{e:07d}',
+            'salary': rng.randrange(40000, 300000),
+            'fk_department': rng.randrange(1, departments + 1),
+            'job_name': rng.choice(('Инженер', 'Аналитик', 'Бухгалтер', 'Менеджер', 'Тестировщик')),
+            'active': 'No' if rng.random() < 0.1 and e > 2 else 'Yes',
+            'role': 'hr' if e == 1 else 'employee',
+            'password_hash': password_hash,
+        })
+    _insert(Employee, employee_rows)
+
+    vacation_rows, contract_rows, hour_rows = [], [], []
+    for e in range(1, employees + 1):
+        # Отпуска сотрудника идут друг за другом и не пересекаются
+        start = today - timedelta(days=365 * 3) + timedelta(days=rng.randrange(60))
+        for _ in range(vacations):
+            length = rng.randrange(3, 15)
+            vacation_rows.append({
+                'fk_employee': e, 'start_date': start, 'end_date': start + timedelta(days=length - 1),
+                'status': rng.choice(('Approved', 'Approved', 'Pending', 'Rejected')),
+            })
+            start += timedelta(days=length + rng.randrange(60, 300))
+        start = today - timedelta(days=365 * 5 + rng.randrange(365))
+        for _ in range(contracts):
+            end = start + timedelta(days=365 * rng.randrange(1, 4))
+            contract_rows.append({
+                'fk_employee': e, 'start_date': start, 'end_date': end,
+                'renewal_notification_date': end - timedelta(days=30),
+            })
+            start = end + timedelta(days=1)
+        for day in range(work_days):
+            hour_rows.append({
+                'fk_employee': e, 'work_date': today - timedelta(days=day + 1),
+                'hours_worked': rng.choice((4, 6, 7.5, 8, 8, 8, 9, 10)),
+            })
+    _insert(Vacation, vacation_rows)
+    _insert(Contract, contract_rows)
+    _insert(WorkHour, hour_rows)
+    rollups.rebuild(db.session.connection())
+    versions.mark_changed(db.session, WorkHourDaily.__tablename__, WorkHourMonthly.__tablename__)
+    db.session.commit()
+    return {
+        'departments': departments, 'employees': employees, 'vacations': len(vacation_rows),
+        'contracts': len(contract_rows), 'work_hours': len(hour_rows),
+    }
+
+
+class Context:
+    """Токены и идентификаторы записей, которыми пользуются сценарии"""
+
+    def __init__(self, hr_token, employee_token, hr_id, employee_id):
+        self.hr = {'Authorization': f'Bearer {hr_token}'}
+        self.employee = {'Authorization': f'Bearer {employee_token}'}
+        self.hr_id = hr_id
+        self.employee_id = employee_id
+        self.employee_ids = [row[0] for row in db.session.query(Employee.employee_id)
+                             .filter(Employee.employee_id > 2).order_by(Employee.employee_id)]
+        self.vacation_ids = [row[0] for row in db.session.query(Vacation.vacation_id).order_by(Vacation.vacation_id)]
+        self.contract_ids = [row[0] for row in db.session.query(Contract.contract_id).order_by(Contract.contract_id)]
+        self.today = date.today()
+        # Новые заявки на отпуск ставятся после всех существующих, чтобы повторный прогон не давал конфликтов
+        latest = db.session.query(func.max(Vacation.end_date)).scalar()
+        self.free_from = max(latest or self.today, self.today) + timedelta(days=1)
+
+    def pick(self, ids, i):
+        return ids[i % len(ids)]
+
+
+def _new_employee(i):
+    return {'first_name': 'Нагрузка', 'last_name': f'Тест{i}', 'email': f'bench-{uuid.uuid4().hex}@benchmark.local',
+            'job_name': 'Инженер', 'fk_department': 1}
+
+
+def _prepare_employee(ctx, i):
+    employee = Employee(**_new_employee(i))
+    db.session.add(employee)
+    db.session.commit()
+    return {'employee_id': employee.employee_id}
+
+
+def _prepare_contract(ctx, i):
+    contract = Contract(fk_employee=ctx.pick(ctx.employee_ids, i), start_date=ctx.today,
+                        end_date=ctx.today + timedelta(days=365))
+    db.session.add(contract)
+    db.session.commit()
+    return {'contract_id': contract.contract_id}
+
+
+def _work_hours_body(ctx, i):
+    day = ctx.today + timedelta(days=1000 + i)
+    return ''.join(json.dumps({'fk_employee': employee_id, 'work_date': day.isoformat(), 'hours_worked': 8}) + '\n'
+                   for employee_id in ctx.employee_ids[:50])
+
+
+# Сценарии: (маршрут из url_map, метод, чей токен, функция (ctx, i, args) -> (путь, параметры запроса),
+# подготовка (ctx, i) -> args вне замера или None)
+SCENARIOS = (
+    ('/api-status', 'GET', None, lambda c, i, a: ('/api-status', {}), None),
+    ('/auth/login', 'POST', None,
+     lambda c, i, a: ('/auth/login', {'json': {'email': BENCH_EMPLOYEE_EMAIL, 'password': BENCH_PASSWORD}}), None),
+    ('/auth/profile', 'GET', 'employee', lambda c, i, a: ('/auth/profile', {}), None),
+    ('/auth/set-password/<int:employee_id>', 'POST', 'hr',
+     lambda c, i, a: (f'/auth/set-password/{c.pick(c.employee_ids, i)}', {'json': {'password': BENCH_PASSWORD}}), None),
+    ('/metrics', 'GET', 'hr', lambda c, i, a: ('/metrics', {}), None),
+    ('/system/hashing', 'GET', 'hr', lambda c, i, a: ('/system/hashing', {}), None),
+    ('/system/db-pool', 'GET', 'hr', lambda c, i, a: ('/system/db-pool', {}), None),
+    ('/sync', 'GET', 'hr', lambda c, i, a: ('/sync?limit=500', {}), None),
+    ('/employees', 'GET', 'hr', lambda c, i, a: ('/employees?limit=100', {}), None),
+    ('/employees', 'GET', 'hr', lambda c, i, a: ('/employees?limit=1000&fields=employee_id,first_name,last_name', {}), None),
+    ('/employees', 'GET', 'hr', lambda c, i, a: ('/employees?format=ndjson', {}), None),
+    ('/employees/search', 'GET', 'hr',
+     lambda c, i, a: (f"/employees/search?q={('анна', 'сотр', 'иван инж', 'менеджер мар')[i % 4]}", {}), None),
+    ('/employees/<int:employee_id>', 'GET', 'hr',
+     lambda c, i, a: (f'/employees/{c.pick(c.employee_ids, i)}', {}), None),
+    ('/employees', 'POST', 'hr', lambda c, i, a: ('/employees', {'json': {**_new_employee(i), 'password': 'x'}}), None),
+    ('/employees/bulk', 'POST', 'hr',
+     lambda c, i, a: ('/employees/bulk', {'json': [_new_employee(i) for _ in range(10)]}), None),
+    ('/employees/<int:employee_id>', 'PUT', 'hr',
+     lambda c, i, a: (f'/employees/{c.pick(c.employee_ids, i)}', {'json': {'phone': f'+7999{i:07d}'}}), None),
+    ('/employees/<int:employee_id>', 'DELETE', 'hr',
+     lambda c, i, a: (f"/employees/{a['employee_id']}", {}), _prepare_employee),
+    ('/vacations', 'POST', 'employee',
+     lambda c, i, a: ('/vacations', {'json': {
+         'fk_employee': c.pick(c.employee_ids, i),
+         'start_date': (c.free_from + timedelta(days=i)).isoformat(),
+         'end_date': (c.free_from + timedelta(days=i)).isoformat(),
+     }}), None),
+    ('/vacations', 'GET', 'hr', lambda c, i, a: ('/vacations', {}), None),
+    ('/employee-vacations/<int:employee_id>', 'GET', 'employee',
+     lambda c, i, a: (f'/employee-vacations/{c.employee_id}', {}), None),
+    ('/vacations/absent', 'GET', 'employee',
+     lambda c, i, a: (f'/vacations/absent?date={c.today - timedelta(days=365 + i % 300)}', {}), None),
+    ('/vacations/<int:vacation_id>', 'GET', 'hr', lambda c, i, a: (f'/vacations/{c.pick(c.vacation_ids, i)}', {}), None),
+    ('/vacations/<int:vacation_id>', 'PUT', 'hr',
+     lambda c, i, a: (f'/vacations/{c.pick(c.vacation_ids, i)}', {'json': {'status': 'Rejected'}}), None),
+    ('/batch', 'POST', 'hr',
+     lambda c, i, a: ('/batch', {'json': {'operations': [
+         {'op': 'vacation_status', 'id': c.pick(c.vacation_ids, i * 50 + k), 'status': ('Approved', 'Pending')[i % 2]}
+         for k in range(50)
+     ]}}), None),
+    ('/work-hours/batch', 'POST', 'hr',
+     lambda c, i, a: ('/work-hours/batch', {'data': _work_hours_body(c, i),
+                                            'content_type': 'application/x-ndjson'}), None),
+    ('/departments', 'GET', 'employee', lambda c, i, a: ('/departments', {}), None),
+    ('/analytics/dashboard', 'GET', 'hr', lambda c, i, a: ('/analytics/dashboard', {}), None),
+    ('/analytics/department-count', 'GET', 'hr', lambda c, i, a: ('/analytics/department-count', {}), None),
+    ('/analytics/average-age', 'GET', 'hr', lambda c, i, a: ('/analytics/average-age?group_by=department', {}), None),
+    ('/analytics/churn-rate', 'GET', 'hr', lambda c, i, a: ('/analytics/churn-rate', {}), None),
+    ('/analytics/average-tenure', 'GET', 'hr', lambda c, i, a: ('/analytics/average-tenure', {}), None),
+    ('/analytics/average-hours-per-department', 'GET', 'hr',
+     lambda c, i, a: (f'/analytics/average-hours-per-department?from={c.today - timedelta(days=45)}&to={c.today}', {}),
+     None),
+    ('/analytics/absence-calendar', 'GET', 'hr',
+     lambda c, i, a: (f'/analytics/absence-calendar?from={c.today - timedelta(days=365)}&to={c.today}', {}), None),
+    ('/contracts', 'GET', 'hr', lambda c, i, a: ('/contracts', {}), None),
+    ('/contracts/expiring', 'GET', 'hr', lambda c, i, a: ('/contracts/expiring?within=90d', {}), None),
+    ('/contracts/<int:contract_id>', 'GET', 'hr', lambda c, i, a: (f'/contracts/{c.pick(c.contract_ids, i)}', {}), None),
+    ('/contracts', 'POST', 'hr',
+     lambda c, i, a: ('/contracts', {'json': {'fk_employee': c.pick(c.employee_ids, i),
+                                              'start_date': c.today.isoformat(),
+                                              'end_date': (c.today + timedelta(days=365)).isoformat()}}), None),
+    ('/contracts/<int:contract_id>', 'PUT', 'hr',
+     lambda c, i, a: (f'/contracts/{c.pick(c.contract_ids, i)}', {'json': {}}), None),
+    ('/contracts/<int:contract_id>', 'DELETE', 'hr',
+     lambda c, i, a: (f"/contracts/{a['contract_id']}", {}), _prepare_contract),
+)
+
+
+def uncovered_routes(app, scenarios=SCENARIOS):
+    """Маршруты приложения, для которых нет сценария (чтобы новые маршруты не выпадали из прогона)"""
+    covered = {(rule, method) for rule, method, *_ in scenarios}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if (rule.rule, method) not in covered:
+                missing.append(f'{method} {rule.rule}')
+    return missing
+
+
+def login(client, email):
+    response = client.post('/auth/login', json={'email': email, 'password': BENCH_PASSWORD})
+    if response.status_code != 200:
+        raise RuntimeError(f"Не удалось войти как {email}: {response.status_code}")
+    data = response.get_json()
+    return data['access_token'], data['employee_id']
+
+
+# Параметр json клиента скрывает модуль json
+_json_dumps = json.dumps
+
+
+class _HttpClient:
+    """Минимальный клиент для локального WSGI-сервера с интерфейсом тестового клиента"""
+
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def open(self, path, method='GET', headers=None, json=None, data=None, content_type=None):
+        headers = dict(headers or {})
+        body = None
+        if json is not None:
+            body = _json_dumps(json)
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = data.encode()
+            headers['Content-Type'] = content_type
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        response.status_code = response.status
+        return response
+
+
+def _peak_rss_mb():
+    # ru_maxrss в Linux - килобайты
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _run_scenario(app, ctx, scenario, requests, concurrency, warmup, make_client):
+    rule, method, role, build, prepare = scenario
+    headers = {'hr': ctx.hr, 'employee': ctx.employee}.get(role, {})
+    total = warmup + requests
+    prepared = [prepare(ctx, i) if prepare else None for i in range(total)]
+
+    local = threading.local()
+
+    def call(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = make_client()
+        path, kwargs = build(ctx, i, prepared[i])
+        started = time.perf_counter()
+        response = client.open(path, method=method, headers=headers, **kwargs)
+        if hasattr(response, 'get_data'):
+            response.get_data()
+        return time.perf_counter() - started, response.status_code
+
+    # Запросы идут из рабочих потоков: в основном потоке открыт контекст
+    # приложения, и тестовый клиент разделял бы между запросами один g
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(warmup)))
+        with count_queries(*db.engines.values()) as counter:
+            started = time.perf_counter()
+            results = list(pool.map(call, range(warmup, total)))
+            elapsed = time.perf_counter() - started
+
+    latencies = np.array([latency for latency, _ in results]) * 1000
+    statuses = sorted({status for _, status in results})
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'route': f'{method} {rule}',
+        'path': build(ctx, warmup, prepared[warmup])[0],
+        'statuses': statuses,
+        'requests': requests,
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'rps': round(requests / elapsed, 1) if elapsed else 0,
+        'queries_per_request': round(counter.count / requests, 2),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def run(app, requests=50, concurrency=1, warmup=3, server=False, only=None):
+    """
+    Прогоняет все сценарии и возвращает (результаты, маршруты без сценария).
+    server=True - запросы идут по HTTP в локальный многопоточный WSGI-сервер,
+    иначе через тестовый клиент Flask. only - подстрока для отбора сценариев.
+    """
+    http_server = None
+    if server:
+        http_server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+        port = http_server.server_port
+        make_client = lambda: _HttpClient(port)
+    else:
+        make_client = app.test_client
+
+    # Результаты разных режимов несравнимы, поэтому режим входит в ключ базовой линии
+    mode = f"{'server' if server else 'test-client'} x{concurrency}"
+    results = []
+    try:
+        # Обработчики входа печатают отладку в stdout - на время замера она не нужна
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = app.test_client()
+            hr_token, hr_id = login(client, BENCH_HR_EMAIL)
+            employee_token, employee_id = login(client, BENCH_EMPLOYEE_EMAIL)
+        with contextlib.redirect_stdout(io.StringIO()), app.app_context():
+            ctx = Context(hr_token, employee_token, hr_id, employee_id)
+            for scenario in SCENARIOS:
+                name = f'{scenario[1]} {scenario[0]}'
+                if only and only not in name:
+                    continue
+                result = _run_scenario(app, ctx, scenario, requests, concurrency, warmup, make_client)
+                result['mode'] = mode
+                results.append(result)
+    finally:
+        if http_server is not None:
+            http_server.shutdown()
+    return results, uncovered_routes(app)
+
+
+def baseline_key(result):
+    return f"{result['route']} {result['path']} [{result['mode']}]"
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Сравнивает результаты с базовой линией. Регрессия - рост p95 больше чем на
+    tolerance (и больше LATENCY_NOISE_MS), падение пропускной способности больше
+    чем на tolerance или рост числа запросов к базе на запрос.
+    Возвращает {ключ сценария: [описания регрессий]}.
+    """
+    regressions = {}
+    for result in results:
+        before = baseline.get(baseline_key(result))
+        if not before:
+            continue
+        problems = []
+        if (result['p95_ms'] > before['p95_ms'] * (1 + tolerance)
+                and result['p95_ms'] - before['p95_ms'] > LATENCY_NOISE_MS):
+            problems.append(f"p95 {before['p95_ms']} -> {result['p95_ms']} мс")
+        if result['rps'] < before['rps'] * (1 - tolerance):
+            problems.append(f"пропускная способность {before['rps']} -> {result['rps']} запросов/с")
+        if result['queries_per_request'] > before['queries_per_request'] + 0.5:
+            problems.append(f"запросов к базе {before['queries_per_request']} -> {result['queries_per_request']}")
+        if problems:
+            regressions[baseline_key(result)] = problems
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    """Записывает результаты в базовую линию, сохраняя сценарии и режимы, которые не прогонялись"""
+    baseline = load_baseline(path)
+    baseline.update({baseline_key(result): result for result in results})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+# Пути для сравнения режимов сервера (bench-serve): списки и аналитика, которые ждут базу
+SERVE_PATHS = ('/employees?limit=100', '/departments', '/vacations', '/analytics/department-count')
+
+
+async def _read_response(reader):
+    """Читает ответ HTTP/1.x; возвращает (статус, можно ли переиспользовать соединение)"""
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin1').split('\r\n')
+    version, status = head[0].split()[:2]
+    headers = {}
+    for line in head[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+    keep_alive = headers.get('connection') != 'close' and (
+        version == 'HTTP/1.1' or headers.get('connection') == 'keep-alive')
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif int(status) not in (204, 304):
+        await reader.read()
+        keep_alive = False
+    return int(status), keep_alive
+
+
+async def _client(host, port, request_bytes, count, latencies, statuses):
+    """Один клиент: count последовательных запросов по keep-alive соединению"""
+    reader = writer = None
+    for _ in range(count):
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request_bytes)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status, keep_alive = 0, False
+        latencies.append(time.perf_counter() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _load(host, port, path, token, concurrency, requests_per_client):
+    request_bytes = (f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+                     f'Authorization: Bearer {token}\r\nConnection: keep-alive\r\n\r\n').encode('latin1')
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, request_bytes, requests_per_client, latencies, statuses)
+                           for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def _raise_file_limit(connections):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = connections + 256
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted if hard == resource.RLIM_INFINITY else min(wanted, hard), hard))
+
+
+def compare_servers(targets, paths=SERVE_PATHS, concurrency_levels=(100, 500, 1000), requests_per_client=5,
+                    email=BENCH_HR_EMAIL, password=BENCH_PASSWORD):
+    """
+    Нагрузка на уже запущенные серверы, например gunicorn (wsgi.py) и uvicorn (asgi.py),
+    с concurrency одновременных клиентов на asyncio (keep-alive соединения).
+    targets - {имя: базовый URL}. Возвращает пропускную способность, задержки
+    и число ошибок (статусы не 2xx/304 и сбои соединения) для каждого сочетания.
+    """
+    _raise_file_limit(max(concurrency_levels))
+    results = []
+    for name, url in targets.items():
+        parsed = urlsplit(url)
+        host, port = parsed.hostname, parsed.port or 80
+        connection = http.client.HTTPConnection(host, port, timeout=60)
+        connection.request('POST', '/auth/login', body=_json_dumps({'email': email, 'password': password}),
+                           headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"Не удалось войти на {url}: {response.status}")
+        token = json.loads(response.read())['access_token']
+        connection.close()
+
+        for path in paths:
+            for concurrency in concurrency_levels:
+                latencies, statuses, elapsed = asyncio.run(
+                    _load(host, port, path, token, concurrency, requests_per_client))
+                p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+                results.append({
+                    'target': name,
+                    'path': path,
+                    'concurrency': concurrency,
+                    'requests': len(latencies),
+                    'errors': sum(count for status, count in statuses.items()
+                                  if not (200 <= status < 300 or status == 304)),
+                    'rps': round(len(latencies) / elapsed, 1),
+                    'p50_ms': round(float(p50), 1),
+                    'p95_ms': round(float(p95), 1),
+                    'p99_ms': round(float(p99), 1),
+                })
+    return results
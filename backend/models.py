@@ -1,7 +1,14 @@
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects import mysql
+from hashing import generate_hash, verify_hash
+from db_routing import RoutingSession
 
-db = SQLAlchemy()
+# Сессия с маршрутизацией чтения на реплику (см. db_routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Время изменения с микросекундами (в MySQL DATETIME по умолчанию хранит только секунды)
+Timestamp = db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
 
 # Модель Department
 class Department(db.Model):
@@ -12,6 +19,14 @@ class Department(db.Model):
 # Модель Employee
 class Employee(db.Model):
     __tablename__ = 'employees'
+    __table_args__ = (
+        # Подсчеты по активности и разбивка по отделам
+        db.Index('ix_employees_active_department', 'active', 'fk_department'),
+        # Список отдела (/employees?department=, по employee_id) и численность по отделам
+        db.Index('ix_employees_department', 'fk_department'),
+        # Лента изменений для /sync
+        db.Index('ix_employees_updated_at', 'updated_at'),
+    )
     employee_id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(20))
     last_name = db.Column(db.String(25), nullable=False)
@@ -28,42 +43,129 @@ class Employee(db.Model):
     
     password_hash = db.Column(db.String(128))
     role = db.Column(db.Enum('hr', 'employee'), default='employee')
+    # Токены, выпущенные раньше этого времени, отозваны (деактивация, смена пароля)
+    tokens_valid_after = db.Column(Timestamp)
+    updated_at = db.Column(Timestamp, nullable=False, default=datetime.now, onupdate=datetime.now)
     
     department = db.relationship('Department', backref='employees')
     employee_contracts = db.relationship('Contract', back_populates='employee')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # Хеширование выполняется в пуле процессов (см. hashing.py)
+        self.password_hash = generate_hash(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)   
+        return verify_hash(self.password_hash, password)   
 
 # Модель Vacation
 class Vacation(db.Model):
     __tablename__ = 'vacations'
+    __table_args__ = (
+        # Отпуска сотрудника по дате начала и проверка пересечения периодов
+        db.Index('ix_vacations_employee_period', 'fk_employee', 'start_date', 'end_date'),
+        # Кто в отпуске на дату или в диапазоне: текущие и будущие отпуска
+        # отбираются по end_date, не просматривая всю историю
+        db.Index('ix_vacations_period', 'end_date', 'start_date'),
+        db.Index('ix_vacations_updated_at', 'updated_at'),
+    )
     vacation_id = db.Column(db.Integer, primary_key=True)
     fk_employee = db.Column(db.Integer, db.ForeignKey('employees.employee_id'), nullable=False)
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     status = db.Column(db.Enum('Pending', 'Approved', 'Rejected'), default='Pending')
+    updated_at = db.Column(Timestamp, nullable=False, default=datetime.now, onupdate=datetime.now)
 
     employee = db.relationship('Employee', backref='vacations')
 
 # Модель Contract
 class Contract(db.Model):
     __tablename__ = 'contracts'
+    __table_args__ = (
+        db.Index('ix_contracts_employee_start', 'fk_employee', 'start_date'),
+        # Сортировка и выборка контрактов по дате окончания
+        db.Index('ix_contracts_end_date', 'end_date'),
+        # Поиск контрактов, по которым пора уведомить о продлении
+        db.Index('ix_contracts_renewal_notification_date', 'renewal_notification_date'),
+        db.Index('ix_contracts_updated_at', 'updated_at'),
+    )
     contract_id = db.Column(db.Integer, primary_key=True)
     fk_employee = db.Column(db.Integer, db.ForeignKey('employees.employee_id'), nullable=False)
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     renewal_notification_date = db.Column(db.Date, default=None)
+    updated_at = db.Column(Timestamp, nullable=False, default=datetime.now, onupdate=datetime.now)
 
     # Связь с Employee
     employee = db.relationship('Employee', back_populates='employee_contracts')
 
+# Очередь уведомлений по контрактам (outbox).
+# Планировщик добавляет запись один раз на контракт, вид и дату события;
+# отправку выполняет отдельный обработчик, отмечая sent_at.
+class ContractNotification(db.Model):
+    __tablename__ = 'contract_notifications'
+    __table_args__ = (
+        db.Index('uq_contract_notifications_event', 'fk_contract', 'kind', 'due_date', unique=True),
+        db.Index('ix_contract_notifications_pending', 'sent_at', 'due_date'),
+    )
+    notification_id = db.Column(db.Integer, primary_key=True)
+    fk_contract = db.Column(db.Integer, db.ForeignKey('contracts.contract_id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.Enum('renewal', 'expiry'), nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    sent_at = db.Column(db.DateTime)
+
+# Отметки об удалении сотрудников, контрактов и отпусков для /sync.
+# Записываются в той же транзакции, что и удаление (см. sync_feed.py).
+class SyncTombstone(db.Model):
+    __tablename__ = 'sync_tombstones'
+    __table_args__ = (
+        db.Index('ix_sync_tombstones_deleted_at', 'deleted_at'),
+    )
+    tombstone_id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.Enum('employees', 'contracts', 'vacations'), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(Timestamp, nullable=False)
+
+# Версии данных по таблицам для ETag и кэшей, общие для всех воркеров.
+# Увеличиваются в транзакции записи (см. versions.py).
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    changed_at = db.Column(Timestamp, nullable=False)
+
 class WorkHour(db.Model):
     __tablename__ = 'work_hours'
+    __table_args__ = (
+        # Одна запись на сотрудника за день; ключ для upsert и агрегации по периоду
+        db.Index('uq_work_hours_employee_date', 'fk_employee', 'work_date', unique=True),
+    )
     entry_id = db.Column(db.Integer, primary_key=True)
     fk_employee = db.Column(db.Integer, db.ForeignKey('employees.employee_id'))
     work_date = db.Column(db.Date)
-    hours_worked = db.Column(db.DECIMAL(4, 2))
\ No newline at end of file
+    hours_worked = db.Column(db.DECIMAL(4, 2))
+
+# Предрасчитанные итоги по отработанным часам.
+# scope = 'employee' (scope_id - employee_id) или 'department' (scope_id - department_id),
+# period_start - день (дневные итоги) или первое число месяца (месячные итоги).
+# Поддерживаются инкрементально при записи WorkHour (см. rollups.py).
+class WorkHourRollupMixin:
+    scope = db.Column(db.Enum('employee', 'department'), primary_key=True)
+    scope_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    period_start = db.Column(db.Date, primary_key=True)
+    hours_sum = db.Column(db.DECIMAL(12, 2), nullable=False, default=0)
+    entries = db.Column(db.Integer, nullable=False, default=0)
+    hours_min = db.Column(db.DECIMAL(4, 2))
+    hours_max = db.Column(db.DECIMAL(4, 2))
+
+class WorkHourDaily(WorkHourRollupMixin, db.Model):
+    __tablename__ = 'work_hours_daily'
+    __table_args__ = (
+        db.Index('ix_work_hours_daily_period', 'scope', 'period_start'),
+    )
+
+class WorkHourMonthly(WorkHourRollupMixin, db.Model):
+    __tablename__ = 'work_hours_monthly'
+    __table_args__ = (
+        db.Index('ix_work_hours_monthly_period', 'scope', 'period_start'),
+    )
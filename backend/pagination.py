@@ -0,0 +1,85 @@
+from flask import request
+
+# Размер страницы по умолчанию и верхняя граница для параметра limit
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def parse_limit(default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Читает limit из строки запроса и ограничивает его допустимым диапазоном"""
+    raw = request.args.get('limit')
+    if raw in (None, ''):
+        return min(default, maximum)
+    # Не type=int: он молча подставляет default вместо limit=abc
+    try:
+        limit = int(raw)
+    except ValueError:
+        limit = None
+    if limit is None or limit < 1:
+        raise ValueError("Параметр limit должен быть положительным числом")
+    return min(limit, maximum)
+
+
+def parse_cursor():
+    """Курсор - первичный ключ последней записи предыдущей страницы"""
+    cursor = request.args.get('cursor')
+    if cursor in (None, ''):
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise ValueError("Недопустимый курсор")
+
+
+def parse_number(name):
+    """Необязательный числовой параметр строки запроса; None, если не задан"""
+    raw = request.args.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть числом")
+
+
+def parse_fields(allowed):
+    """Разбирает параметр fields=a,b,c и проверяет, что все поля разрешены"""
+    raw = request.args.get('fields')
+    if not raw:
+        return list(allowed)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f"Недопустимые поля: {', '.join(unknown)}")
+    return fields
+
+
+def escape_like(value):
+    """Экранирует спецсимволы LIKE, чтобы префикс искался буквально"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def keyset_page(query, key_column, cursor, limit):
+    """
+    Возвращает страницу записей после cursor, упорядоченную по key_column,
+    и курсор следующей страницы (None, если страница последняя).
+    Выбирается limit + 1 строка, чтобы узнать о наличии следующей страницы
+    без отдельного COUNT.
+    """
+    return split_page(keyset_query(query, key_column, cursor, limit).all(), key_column, limit)
+
+
+def keyset_query(query, key_column, cursor, limit):
+    """Запрос страницы после cursor: limit + 1 строка по возрастанию key_column"""
+    if cursor is not None:
+        query = query.filter(key_column > cursor)
+    return query.order_by(key_column).limit(limit + 1)
+
+
+def split_page(rows, key_column, limit):
+    """Отрезает лишнюю строку страницы и возвращает (строки, курсор следующей страницы)"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = getattr(rows[-1], key_column.key)
+    return rows, next_cursor
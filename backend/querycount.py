@@ -0,0 +1,61 @@
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+
+# Максимальное число SQL-запросов для списочного эндпоинта.
+# Не должно зависеть от количества строк: рост означает N+1.
+LIST_ENDPOINT_QUERY_LIMIT = 3
+
+# Списочные эндпоинты, которые проверяет команда check-query-counts
+LIST_ENDPOINTS = (
+    '/employees',
+    '/vacations',
+    '/contracts',
+    '/departments',
+    '/employees?format=ndjson',
+    '/vacations?format=ndjson',
+    '/contracts?format=ndjson',
+)
+
+
+class QueryCounter:
+    """Счетчик выполненных SQL-запросов (запросы могут идти из нескольких потоков)"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+        self._lock = threading.Lock()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+            self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(*engines):
+    """Считает все запросы, выполненные через engines внутри блока with"""
+    counter = QueryCounter()
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', counter)
+
+
+def measure_list_endpoints(app, engines, headers):
+    """
+    Вызывает списочные эндпоинты через тестовый клиент и возвращает
+    для каждого кортеж (путь, статус ответа, число SQL-запросов)
+    """
+    results = []
+    client = app.test_client()
+    for path in LIST_ENDPOINTS:
+        with count_queries(*engines) as counter:
+            response = client.get(path, headers=headers)
+            # Потоковые ответы выполняют запросы во время чтения тела
+            response.get_data()
+        results.append((path, response.status_code, counter.count))
+    return results
@@ -0,0 +1,301 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Метрики запросов для /metrics в текстовом формате Prometheus.
+# Для каждого маршрута: полное время, время проверки токена (auth), работы с
+# базой (db) и сериализации (serialize), число и время SQL-запросов, размер ответа.
+# Метрики ведутся в памяти процесса: при нескольких воркерах каждый отдает свои.
+
+# Границы корзин гистограмм
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+PHASES = ('auth', 'db', 'serialize')
+
+# Профилирование медленных запросов (0 - выключено): доля профилируемых запросов,
+# порог в миллисекундах, интервал выборки стека и каталог для файлов со стеками
+PROFILE_SLOW_MS = 0
+PROFILE_SAMPLE_RATE = 1.0
+PROFILE_INTERVAL = 0.005
+PROFILE_DIR = 'profiles'
+
+
+class Histogram:
+    """Гистограмма с накопительными корзинами по набору меток"""
+
+    def __init__(self, name, description, labels, buckets):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, label_values, value):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total) in sorted(self._series.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+class CounterMetric:
+    """Счетчик по набору меток"""
+
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._series = Counter()
+
+    def inc(self, label_values, value=1):
+        self._series[label_values] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self._series.items()):
+            lines.append(f'{self.name}{{{_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class RequestMetrics:
+    """Все метрики запросов; запись и выгрузка под одной блокировкой"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = CounterMetric(
+            'http_requests_total', 'Число обработанных запросов', ('method', 'route', 'status'))
+        self.duration = Histogram(
+            'http_request_duration_seconds', 'Полное время обработки запроса',
+            ('method', 'route'), DURATION_BUCKETS)
+        self.phases = Histogram(
+            'http_request_phase_seconds', 'Время запроса по фазам: auth, db, serialize',
+            ('method', 'route', 'phase'), DURATION_BUCKETS)
+        self.queries = Histogram(
+            'http_request_sql_queries', 'Число SQL-запросов на запрос', ('method', 'route'), QUERY_COUNT_BUCKETS)
+        self.size = Histogram(
+            'http_response_size_bytes', 'Размер ответа (кроме потоковых)', ('method', 'route'), SIZE_BUCKETS)
+        self.slow_profiles = CounterMetric(
+            'http_slow_request_profiles_total', 'Сохраненные профили медленных запросов', ('method', 'route'))
+
+    def record(self, method, route, status, duration, phases, queries, size):
+        key = (method, route)
+        with self._lock:
+            self.requests.inc((method, route, str(status)))
+            self.duration.observe(key, duration)
+            for phase in PHASES:
+                self.phases.observe((method, route, phase), phases.get(phase, 0.0))
+            self.queries.observe(key, queries)
+            if size is not None:
+                self.size.observe(key, size)
+
+    def profile_saved(self, method, route):
+        with self._lock:
+            self.slow_profiles.inc((method, route))
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.duration, self.phases, self.queries, self.size, self.slow_profiles):
+                lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+metrics = RequestMetrics()
+
+
+def _stats():
+    """Счетчики текущего запроса или None вне запроса (CLI, фоновые потоки)"""
+    if not has_request_context():
+        return None
+    return g.get('request_stats')
+
+
+@contextmanager
+def phase(name):
+    """Добавляет время блока к фазе name текущего запроса"""
+    stats = _stats()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats['phases'][name] = stats['phases'].get(name, 0.0) + time.perf_counter() - started
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    stats = _stats()
+    if stats is not None:
+        stats['queries'] += 1
+        stats['phases']['db'] = stats['phases'].get('db', 0.0) + time.perf_counter() - started
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    # after_cursor_execute для упавшего запроса не вызывается
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_started'):
+        connection.info['query_started'].pop()
+
+
+class StackSampler:
+    """
+    Выборочный профилировщик: один фоновый поток раз в interval секунд снимает
+    стеки потоков, обрабатывающих профилируемые запросы. Стеки копятся в формате
+    collapsed (функции через ';' и число выборок), который читают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._active[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[_collapse(frame)] += 1
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def _get_sampler():
+    """Общий для потоков процесса сэмплер; создается при первом профилируемом запросе"""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = StackSampler(PROFILE_INTERVAL)
+    return _sampler
+
+
+def _write_profile(method, route, duration, stacks):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{method}-{route.strip('/').replace('/', '_') or 'root'}.folded"
+    path = os.path.join(PROFILE_DIR, ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name))
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    logger.info("Медленный запрос %s %s (%.0f мс), профиль: %s", method, route, duration * 1000, path)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON-провайдер Flask, время кодирования которого (jsonify) идет в фазу serialize"""
+
+    def dumps(self, obj, **kwargs):
+        with phase('serialize'):
+            return super().dumps(obj, **kwargs)
+
+
+def register_request_metrics(app):
+    """Замер каждого запроса приложения и профилирование медленных запросов"""
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def start_request():
+        g.request_stats = {'started': time.perf_counter(), 'queries': 0, 'phases': {}, 'profiled': False}
+        if PROFILE_SLOW_MS and random.random() < PROFILE_SAMPLE_RATE:
+            _get_sampler().start(threading.get_ident())
+            g.request_stats['profiled'] = True
+
+    @app.after_request
+    def finish_request(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        duration = time.perf_counter() - stats['started']
+        method = request.method
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        size = None if response.is_streamed else response.calculate_content_length()
+        metrics.record(method, route, response.status_code, duration, stats['phases'], stats['queries'], size)
+
+        if stats['profiled']:
+            stacks = _sampler.stop(threading.get_ident())
+            if duration * 1000 >= PROFILE_SLOW_MS and stacks:
+                try:
+                    _write_profile(method, route, duration, stacks)
+                    metrics.profile_saved(method, route)
+                except OSError:
+                    logger.exception("Не удалось сохранить профиль запроса")
+        return response
+
+    @app.teardown_request
+    def abort_request(exc):
+        # Запрос завершился исключением до after_request - профиль не нужен
+        stats = g.pop('request_stats', None)
+        if stats is not None and stats['profiled']:
+            _sampler.stop(threading.get_ident())
@@ -0,0 +1,376 @@
+from datetime import timedelta
+from decimal import Decimal
+from sqlalchemy import delete, event, func, insert, inspect, literal, select, union_all
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Date
+from models import db, Department, Employee, WorkHour, WorkHourDaily, WorkHourMonthly
+
+# Итоги по часам поддерживаются так:
+#  - новые записи WorkHour добавляют к итогам дельты (upsert sum/count/min/max);
+#  - изменение или удаление записи пересчитывает затронутые периоды из work_hours;
+#  - перевод сотрудника в другой отдел пересчитывает итоги старого и нового отдела
+#    за период его записей (итоги отдела считаются по текущему отделу сотрудника);
+#  - команда backfill-rollups пересобирает итоги целиком или за диапазон дат.
+
+ROLLUP_KEY = ('scope', 'scope_id', 'period_start')
+
+
+class month_floor(FunctionElement):
+    """Первое число месяца для даты в SQL"""
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(month_floor, 'mysql')
+def _month_floor_mysql(element, compiler, **kw):
+    value = compiler.process(list(element.clauses)[0], **kw)
+    return f"DATE_SUB({value}, INTERVAL DAYOFMONTH({value}) - 1 DAY)"
+
+
+@compiles(month_floor)
+def _month_floor_default(element, compiler, **kw):
+    value = compiler.process(list(element.clauses)[0], **kw)
+    return f"date({value}, 'start of month')"
+
+
+def _period_start(model, day):
+    return day if model is WorkHourDaily else day.replace(day=1)
+
+
+def _upsert(connection, model, rows):
+    """Добавляет дельты к итогам: sum и count складываются, min/max уточняются"""
+    table = model.__table__
+    if connection.dialect.name == 'mysql':
+        stmt = mysql.insert(table)
+        new = stmt.inserted
+        stmt = stmt.on_duplicate_key_update(
+            hours_sum=table.c.hours_sum + new.hours_sum,
+            entries=table.c.entries + new.entries,
+            hours_min=func.least(table.c.hours_min, new.hours_min),
+            hours_max=func.greatest(table.c.hours_max, new.hours_max),
+        )
+    else:
+        stmt = sqlite.insert(table)
+        new = stmt.excluded
+        stmt = stmt.on_conflict_do_update(index_elements=list(ROLLUP_KEY), set_={
+            'hours_sum': table.c.hours_sum + new.hours_sum,
+            'entries': table.c.entries + new.entries,
+            'hours_min': func.min(table.c.hours_min, new.hours_min),
+            'hours_max': func.max(table.c.hours_max, new.hours_max),
+        })
+    connection.execute(stmt, rows)
+
+
+def _departments_of(connection, employee_ids):
+    if not employee_ids:
+        return {}
+    rows = connection.execute(
+        select(Employee.employee_id, Employee.fk_department)
+        .where(Employee.employee_id.in_(employee_ids))
+    )
+    return dict(rows.all())
+
+
+def apply_increments(connection, entries):
+    """
+    Учитывает в итогах новые записи.
+    entries - список (fk_employee, work_date, hours_worked).
+    """
+    entries = [entry for entry in entries if None not in entry]
+    if not entries:
+        return
+    departments = _departments_of(connection, {employee_id for employee_id, _, _ in entries})
+
+    for model in (WorkHourDaily, WorkHourMonthly):
+        deltas = {}
+        for employee_id, day, hours in entries:
+            hours = Decimal(str(hours))
+            period = _period_start(model, day)
+            scopes = [('employee', employee_id)]
+            if departments.get(employee_id) is not None:
+                scopes.append(('department', departments[employee_id]))
+            for scope, scope_id in scopes:
+                key = (scope, scope_id, period)
+                delta = deltas.get(key)
+                if delta is None:
+                    deltas[key] = [hours, 1, hours, hours]
+                else:
+                    delta[0] += hours
+                    delta[1] += 1
+                    delta[2] = min(delta[2], hours)
+                    delta[3] = max(delta[3], hours)
+        _upsert(connection, model, [{
+            'scope': scope, 'scope_id': scope_id, 'period_start': period,
+            'hours_sum': delta[0], 'entries': delta[1],
+            'hours_min': delta[2], 'hours_max': delta[3],
+        } for (scope, scope_id, period), delta in deltas.items()])
+
+
+def _aggregate_select(model, scope, date_from, date_to, employee_ids, department_ids):
+    """SELECT итогов из work_hours для одного вида итогов (день/месяц, сотрудник/отдел)"""
+    period = WorkHour.work_date if model is WorkHourDaily else month_floor(WorkHour.work_date)
+    if scope == 'employee':
+        scope_id = WorkHour.fk_employee
+        query = select(literal('employee'), scope_id, period)
+    else:
+        scope_id = Employee.fk_department
+        query = select(literal('department'), scope_id, period).join(
+            Employee, Employee.employee_id == WorkHour.fk_employee
+        ).where(Employee.fk_department != None)
+    query = query.add_columns(
+        func.sum(WorkHour.hours_worked),
+        func.count(WorkHour.hours_worked),
+        func.min(WorkHour.hours_worked),
+        func.max(WorkHour.hours_worked),
+    ).where(WorkHour.hours_worked != None, WorkHour.work_date != None)
+    if date_from is not None:
+        query = query.where(WorkHour.work_date >= date_from)
+    if date_to is not None:
+        query = query.where(WorkHour.work_date <= date_to)
+    if scope == 'employee' and employee_ids is not None:
+        query = query.where(WorkHour.fk_employee.in_(employee_ids))
+    if scope == 'department' and department_ids is not None:
+        query = query.where(Employee.fk_department.in_(department_ids))
+    return query.group_by(scope_id, period)
+
+
+def rebuild(connection, date_from=None, date_to=None, employee_ids=None):
+    """
+    Пересчитывает итоги из work_hours за диапазон дат.
+    Если указаны employee_ids - только итоги этих сотрудников и их отделов.
+    Месячные итоги пересчитываются целыми месяцами.
+    """
+    department_ids = None
+    if employee_ids is not None:
+        employee_ids = list(employee_ids)
+        department_ids = [d for d in set(_departments_of(connection, employee_ids).values()) if d is not None]
+
+    for model in (WorkHourDaily, WorkHourMonthly):
+        start, end = date_from, date_to
+        if model is WorkHourMonthly:
+            if start is not None:
+                start = start.replace(day=1)
+            if end is not None:
+                end = (end.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+        for scope, ids in (('employee', employee_ids), ('department', department_ids)):
+            if ids is not None and not ids:
+                continue
+            removal = delete(model).where(model.scope == scope)
+            if start is not None:
+                removal = removal.where(model.period_start >= start)
+            if end is not None:
+                removal = removal.where(model.period_start <= end)
+            if ids is not None:
+                removal = removal.where(model.scope_id.in_(ids))
+            connection.execute(removal)
+            connection.execute(insert(model).from_select(
+                ['scope', 'scope_id', 'period_start', 'hours_sum', 'entries', 'hours_min', 'hours_max'],
+                _aggregate_select(model, scope, start, end, employee_ids, department_ids),
+            ))
+
+
+def rebuild_departments(connection, department_ids, date_from=None, date_to=None):
+    """Пересчитывает итоги отделов department_ids из work_hours по текущим отделам сотрудников"""
+    department_ids = [d for d in set(department_ids) if d is not None]
+    if not department_ids:
+        return
+    for model in (WorkHourDaily, WorkHourMonthly):
+        start = _period_start(model, date_from) if date_from is not None else None
+        end = date_to
+        removal = delete(model).where(model.scope == 'department', model.scope_id.in_(department_ids))
+        if start is not None:
+            removal = removal.where(model.period_start >= start)
+        if end is not None:
+            removal = removal.where(model.period_start <= end)
+        connection.execute(removal)
+        if model is WorkHourMonthly and end is not None:
+            end = (end.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        connection.execute(insert(model).from_select(
+            ['scope', 'scope_id', 'period_start', 'hours_sum', 'entries', 'hours_min', 'hours_max'],
+            _aggregate_select(model, 'department', start, end, None, department_ids),
+        ))
+
+
+def _old_value(obj, attribute):
+    history = inspect(obj).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(obj, attribute)
+
+
+def register_rollup_listeners(session):
+    """Поддержка итогов при записи WorkHour через ORM (в той же транзакции)"""
+    @event.listens_for(session, 'after_flush')
+    def after_flush(session, flush_context):
+        added = [obj for obj in session.new if isinstance(obj, WorkHour)]
+        changed = [obj for obj in session.dirty if isinstance(obj, WorkHour) and session.is_modified(obj)]
+        changed += [obj for obj in session.deleted if isinstance(obj, WorkHour)]
+        moved = [obj for obj in session.dirty
+                 if isinstance(obj, Employee) and inspect(obj).attrs['fk_department'].history.has_changes()]
+        if not added and not changed and not moved:
+            return
+
+        connection = session.connection()
+        if moved:
+            departments = set()
+            for obj in moved:
+                departments.update((_old_value(obj, 'fk_department'), obj.fk_department))
+            first_day, last_day = connection.execute(
+                select(func.min(WorkHour.work_date), func.max(WorkHour.work_date))
+                .where(WorkHour.fk_employee.in_([obj.employee_id for obj in moved]))
+            ).one()
+            if first_day is not None:
+                rebuild_departments(connection, departments, first_day, last_day)
+        if added:
+            apply_increments(connection, [(obj.fk_employee, obj.work_date, obj.hours_worked) for obj in added])
+        if changed:
+            employee_ids, dates = set(), set()
+            for obj in changed:
+                for attribute_value in (_old_value(obj, 'fk_employee'), obj.fk_employee):
+                    if attribute_value is not None:
+                        employee_ids.add(attribute_value)
+                for attribute_value in (_old_value(obj, 'work_date'), obj.work_date):
+                    if attribute_value is not None:
+                        dates.add(attribute_value)
+            if employee_ids and dates:
+                rebuild(connection, min(dates), max(dates), employee_ids)
+
+
+def _split_range(date_from, date_to):
+    """
+    Делит диапазон на целые месяцы (берутся из месячных итогов)
+    и неполные месяцы по краям (берутся из дневных итогов).
+    Возвращает (список дневных диапазонов, диапазон месяцев или None).
+    """
+    first_full = date_from if date_from.day == 1 else (date_from.replace(day=1) + timedelta(days=32)).replace(day=1)
+    after_last_full = (date_to + timedelta(days=1)).replace(day=1)
+    if first_full >= after_last_full:
+        return [(date_from, date_to)], None
+    daily = []
+    if date_from < first_full:
+        daily.append((date_from, first_full - timedelta(days=1)))
+    if after_last_full <= date_to:
+        daily.append((after_last_full, date_to))
+    last_full = (after_last_full - timedelta(days=1)).replace(day=1)
+    return daily, (first_full, last_full)
+
+
+def average_hours_query(date_from=None, date_to=None):
+    """
+    Запрос сумм часов и числа записей по отделам из предрасчитанных итогов
+    (None, если период пуст). Стоимость зависит от числа отделов и периодов,
+    а не от числа записей.
+    """
+    parts = []
+    if date_from is None and date_to is None:
+        parts.append(select(WorkHourMonthly.scope_id, WorkHourMonthly.hours_sum, WorkHourMonthly.entries)
+                     .where(WorkHourMonthly.scope == 'department'))
+    else:
+        if date_from is None:
+            date_from = db.session.query(func.min(WorkHourDaily.period_start)).scalar() or date_to
+        if date_to is None:
+            date_to = db.session.query(func.max(WorkHourDaily.period_start)).scalar() or date_from
+        if date_from is None or date_from > date_to:
+            return None
+        daily, monthly = _split_range(date_from, date_to)
+        for start, end in daily:
+            parts.append(select(WorkHourDaily.scope_id, WorkHourDaily.hours_sum, WorkHourDaily.entries)
+                         .where(WorkHourDaily.scope == 'department',
+                                WorkHourDaily.period_start.between(start, end)))
+        if monthly:
+            parts.append(select(WorkHourMonthly.scope_id, WorkHourMonthly.hours_sum, WorkHourMonthly.entries)
+                         .where(WorkHourMonthly.scope == 'department',
+                                WorkHourMonthly.period_start.between(*monthly)))
+
+    totals = (parts[0] if len(parts) == 1 else union_all(*parts)).subquery()
+    return db.session.query(
+        Department.name,
+        func.sum(totals.c.hours_sum).label('hours_sum'),
+        func.sum(totals.c.entries).label('entries'),
+    ).join(
+        totals, totals.c.scope_id == Department.department_id
+    ).group_by(Department.department_id, Department.name)
+
+
+def live_average_hours_query(date_from=None, date_to=None):
+    """Запрос сумм часов и числа записей по отделам напрямую из work_hours"""
+    query = db.session.query(
+        Department.name,
+        func.sum(WorkHour.hours_worked).label('hours_sum'),
+        func.count(WorkHour.hours_worked).label('entries'),
+    ).join(
+        Employee, Department.department_id == Employee.fk_department
+    ).join(
+        WorkHour, Employee.employee_id == WorkHour.fk_employee
+    )
+    if date_from is not None:
+        query = query.filter(WorkHour.work_date >= date_from)
+    if date_to is not None:
+        query = query.filter(WorkHour.work_date <= date_to)
+    return query.group_by(Department.department_id, Department.name)
+
+
+# Движки, на которых итоги уже построены (дальше их поддерживают слушатели)
+_built_engines = set()
+
+
+def rollups_built():
+    """
+    Построены ли итоги в текущей базе. На существующей базе до ensure-schema
+    таблиц итогов нет, а до backfill-rollups в них есть только дельты новых
+    записей: итоги считаются построенными, когда число учтенных в них записей
+    совпадает с work_hours. Положительный результат запоминается для движка.
+    """
+    connection = db.session.connection()
+    if connection.engine in _built_engines:
+        return True
+    inspector = inspect(connection)
+    if not all(inspector.has_table(model.__tablename__) for model in (WorkHourDaily, WorkHourMonthly)):
+        return False
+    rolled = db.session.query(func.coalesce(func.sum(WorkHourMonthly.entries), 0)) \
+        .filter(WorkHourMonthly.scope == 'employee').scalar()
+    raw = db.session.query(func.count(WorkHour.hours_worked)) \
+        .filter(WorkHour.fk_employee.isnot(None), WorkHour.work_date.isnot(None)).scalar()
+    if int(rolled) != raw:
+        return False
+    _built_engines.add(connection.engine)
+    return True
+
+
+def average_hours_per_department(date_from=None, date_to=None):
+    """
+    Среднее число часов по отделам из предрасчитанных итогов.
+    Пока итоги не построены (ensure-schema и backfill-rollups), считается
+    по work_hours, как раньше.
+    """
+    if rollups_built():
+        query = average_hours_query(date_from, date_to)
+    else:
+        query = live_average_hours_query(date_from, date_to)
+    rows = query.all() if query is not None else []
+    return [{
+        'department': row.name,
+        'average_hours': round(float(row.hours_sum) / row.entries, 1)
+    } for row in rows if row.entries]
+
+
+def check_department_rollups(connection):
+    """
+    Сравнивает дневные и месячные итоги отделов с агрегатом по work_hours и текущим
+    отделам сотрудников. Возвращает список расхождений (отдел, период, итоги, агрегат).
+    """
+    mismatches = []
+    for model in (WorkHourDaily, WorkHourMonthly):
+        raw = {(row[1], row[2]): (row[3], row[4]) for row in connection.execute(
+            _aggregate_select(model, 'department', None, None, None, None))}
+        stored = {(row.scope_id, row.period_start): (row.hours_sum, row.entries) for row in connection.execute(
+            select(model.scope_id, model.period_start, model.hours_sum, model.entries)
+            .where(model.scope == 'department'))}
+        for key in sorted(set(raw) | set(stored), key=str):
+            expected = raw.get(key)
+            actual = stored.get(key)
+            if expected is None or actual is None or expected[1] != actual[1] \
+                    or round(float(expected[0]), 2) != round(float(actual[0]), 2):
+                mismatches.append((key[0], key[1], actual, expected))
+    return mismatches
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
 from marshmallow import fields
 from models import Employee, Department, Vacation, Contract, db
@@ -9,10 +10,21 @@ class EmployeeSchema(SQLAlchemyAutoSchema):
         load_instance = True
         sqla_session = db.session
         include_fk = True  # Включаем fk_department
+        exclude = ('tokens_valid_after',)
 
 employee_schema = EmployeeSchema()
 employees_schema = EmployeeSchema(many=True)
 
+# Поля, доступные в списке сотрудников (хеш пароля наружу не отдается)
+EMPLOYEE_LIST_FIELDS = tuple(
+    column.key for column in Employee.__table__.columns if column.key not in ('password_hash', 'tokens_valid_after')
+)
+
+@lru_cache(maxsize=64)
+def employees_projection_schema(field_names):
+    """Схема списка сотрудников, ограниченная набором полей field_names (кортеж)"""
+    return EmployeeSchema(many=True, only=field_names)
+
 # Схема для Contract
 class ContractSchema(SQLAlchemyAutoSchema):
     class Meta:
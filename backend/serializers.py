@@ -0,0 +1,220 @@
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from flask import current_app, request
+from models import db, Employee, Vacation, Contract
+from schemas import EMPLOYEE_LIST_FIELDS
+from request_metrics import phase
+from pagination import parse_number, escape_like
+
+try:
+    import orjson
+except ImportError:  # без orjson используется стандартный json (медленнее)
+    orjson = None
+
+# Сериализация списков без marshmallow: запрос выбирает только нужные колонки
+# (with_entities / select), строки-кортежи превращаются в словари по заранее
+# заданной раскладке, а JSON кодируется orjson сразу в bytes.
+# Формат ответа совпадает с прежними схемами marshmallow (schemas.py),
+# которые остаются для карточек и проверки входных данных.
+
+
+def _default(value):
+    """Типы, которые orjson не кодирует сам (даты он кодирует нативно)"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps(data):
+    """JSON в bytes; даты в ISO, Decimal строкой (как в jsonify)"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, default=_default).encode()
+
+
+def json_response(data, status=200):
+    with phase('serialize'):
+        body = dumps(data)
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+class RowSerializer:
+    """
+    Раскладка строки запроса в словарь ответа.
+    fields - пары (имя, колонка) верхнего уровня, nested - {имя: пары вложенного объекта},
+    computed - {имя: функция(словарь строки)} для вычисляемых полей.
+    columns - колонки для with_entities/select в том же порядке, в каком их читает dump.
+    """
+
+    def __init__(self, fields, nested=None, computed=None):
+        self.names = tuple(name for name, _ in fields)
+        self.nested = tuple((name, tuple(sub for sub, _ in pairs)) for name, pairs in (nested or {}).items())
+        self.computed = tuple((computed or {}).items())
+        self.columns = [column for _, column in fields]
+        for _, pairs in (nested or {}).items():
+            self.columns += [column for _, column in pairs]
+
+    def dump(self, rows):
+        with phase('serialize'):
+            return self._dump(rows)
+
+    def _dump(self, rows):
+        names, nested, computed = self.names, self.nested, self.computed
+        width = len(names)
+        if not nested and not computed:
+            return [dict(zip(names, row)) for row in rows]
+        items = []
+        for row in rows:
+            item = dict(zip(names, row[:width]))
+            offset = width
+            for name, sub_names in nested:
+                values = row[offset:offset + len(sub_names)]
+                offset += len(sub_names)
+                item[name] = dict(zip(sub_names, values)) if any(v is not None for v in values) else None
+            for name, compute in computed:
+                item[name] = compute(item)
+            items.append(item)
+        return items
+
+
+def _columns(model, names):
+    return [(name, getattr(model, name)) for name in names]
+
+
+@lru_cache(maxsize=64)
+def employee_serializer(field_names=EMPLOYEE_LIST_FIELDS):
+    """Сериализатор списка сотрудников с набором полей field_names (кортеж)"""
+    return RowSerializer(_columns(Employee, field_names))
+
+
+# Отпуск с вложенным сотрудником, как в VacationSchema
+VACATION_FIELDS = ('vacation_id', 'fk_employee', 'start_date', 'end_date', 'status', 'updated_at')
+vacation_serializer = RowSerializer(
+    _columns(Vacation, VACATION_FIELDS),
+    nested={'employee': _columns(Employee, ('first_name', 'last_name', 'email'))},
+)
+
+
+def _employee_name(item):
+    employee = item.pop('_employee')
+    if employee is None:
+        return "Сотрудник удален"
+    return f"{employee['first_name']} {employee['last_name']}"
+
+
+# Контракт с id сотрудника в employee и его именем в employee_name, как в ContractSchema
+CONTRACT_FIELDS = ('contract_id', 'fk_employee', 'start_date', 'end_date',
+                   'renewal_notification_date', 'updated_at')
+contract_serializer = RowSerializer(
+    _columns(Contract, CONTRACT_FIELDS) + [('employee', Employee.employee_id)],
+    nested={'_employee': _columns(Employee, ('first_name', 'last_name'))},
+    computed={'employee_name': _employee_name},
+)
+
+
+def vacation_rows():
+    """Запрос строк отпусков для vacation_serializer (сотрудник одним JOIN)"""
+    return db.session.query(Vacation).join(
+        Employee, Employee.employee_id == Vacation.fk_employee
+    ).with_entities(*vacation_serializer.columns)
+
+
+def contract_rows():
+    """Запрос строк контрактов для contract_serializer (сотрудник может быть удален)"""
+    return db.session.query(Contract).outerjoin(
+        Employee, Employee.employee_id == Contract.fk_employee
+    ).with_entities(*contract_serializer.columns)
+
+
+def employees_list_query(fields):
+    """Сериализатор и запрос списка сотрудников с фильтрами из строки запроса"""
+    # В SQL выбираем только запрошенные колонки (+ ключ для курсора в конце строки)
+    serializer = employee_serializer(tuple(fields))
+    columns = serializer.columns
+    if 'employee_id' not in fields:
+        columns = columns + [Employee.employee_id]
+    query = Employee.query.with_entities(*columns)
+
+    # Фильтры на стороне сервера
+    department = request.args.get('department', type=int)
+    if department is not None:
+        query = query.filter(Employee.fk_department == department)
+    active = request.args.get('active')
+    if active:
+        query = query.filter(Employee.active == active)
+    role = request.args.get('role')
+    if role:
+        query = query.filter(Employee.role == role)
+    job_name = request.args.get('job_name')
+    if job_name:
+        query = query.filter(Employee.job_name.like(escape_like(job_name) + '%', escape='\\'))
+    gender = request.args.get('gender')
+    if gender:
+        query = query.filter(Employee.gender == gender)
+    salary_min = parse_number('salary_min')
+    if salary_min is not None:
+        query = query.filter(Employee.salary >= salary_min)
+    salary_max = parse_number('salary_max')
+    if salary_max is not None:
+        query = query.filter(Employee.salary <= salary_max)
+    return serializer, query
+
+
+def benchmark(limit=None, repeat=3):
+    """
+    Строк в секунду для списков: ORM + marshmallow + jsonify против
+    колонок with_entities + RowSerializer + orjson. Берется лучший из repeat прогонов.
+    """
+    from sqlalchemy.orm import joinedload
+    from schemas import employees_projection_schema, vacations_schema, contracts_schema
+
+    def orm_employees():
+        return employees_projection_schema(EMPLOYEE_LIST_FIELDS).dump(
+            Employee.query.order_by(Employee.employee_id).limit(limit).all())
+
+    def fast_employees():
+        serializer = employee_serializer()
+        return serializer.dump(Employee.query.with_entities(*serializer.columns)
+                               .order_by(Employee.employee_id).limit(limit).all())
+
+    cases = (
+        ('employees', orm_employees, fast_employees),
+        ('vacations',
+         lambda: vacations_schema.dump(Vacation.query.options(joinedload(Vacation.employee))
+                                       .order_by(Vacation.vacation_id).limit(limit).all()),
+         lambda: vacation_serializer.dump(vacation_rows().order_by(Vacation.vacation_id).limit(limit).all())),
+        ('contracts',
+         lambda: contracts_schema.dump(Contract.query.options(joinedload(Contract.employee))
+                                       .order_by(Contract.contract_id).limit(limit).all()),
+         lambda: contract_serializer.dump(contract_rows().order_by(Contract.contract_id).limit(limit).all())),
+    )
+
+    def measure(build, encode):
+        best, rows = None, 0
+        for _ in range(repeat):
+            db.session.expunge_all()
+            started = time.perf_counter()
+            items = build()
+            encode(items)
+            elapsed = time.perf_counter() - started
+            rows = len(items)
+            best = elapsed if best is None else min(best, elapsed)
+        return rows, best
+
+    results = []
+    for name, before, after in cases:
+        rows, before_seconds = measure(before, lambda items: current_app.json.dumps(items))
+        _, after_seconds = measure(after, dumps)
+        results.append({
+            'endpoint': name,
+            'rows': rows,
+            'before_rows_per_second': round(rows / before_seconds) if before_seconds else 0,
+            'after_rows_per_second': round(rows / after_seconds) if after_seconds else 0,
+            'speedup': round(before_seconds / after_seconds, 1) if after_seconds else 0,
+        })
+    return results
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import joinedload
+from models import db, Employee, Contract, Vacation, SyncTombstone
+from schemas import EMPLOYEE_LIST_FIELDS, employees_projection_schema, contracts_schema, vacations_schema
+
+# Лента изменений для /sync строится по updated_at строк и отметкам об удалении.
+# Курсор - время (с микросекундами), до которого клиент уже получил изменения.
+# Курсор отстает от текущего времени на SYNC_SAFETY_SECONDS: транзакция,
+# получившая updated_at раньше, но закоммиченная позже, попадет в следующий ответ.
+
+SYNC_SAFETY_SECONDS = 5
+
+# Сколько дней хранятся отметки об удалении; более старый курсор требует полной синхронизации
+TOMBSTONE_RETENTION_DAYS = 90
+
+SYNC_MODELS = {Employee: 'employees', Contract: 'contracts', Vacation: 'vacations'}
+
+
+class CursorExpired(Exception):
+    """Курсор старше срока хранения отметок об удалении"""
+
+
+def parse_cursor(raw):
+    """Курсор из параметра since; None - синхронизация с начала"""
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValueError("Некорректный курсор since")
+
+
+def encode_cursor(moment):
+    return moment.isoformat(timespec='microseconds')
+
+
+def register_sync_listeners(session):
+    """Записывает отметку об удалении в той же транзакции, что и само удаление"""
+    @event.listens_for(session, 'after_flush')
+    def after_flush(session, flush_context):
+        deleted_at = datetime.now()
+        rows = [{'entity': SYNC_MODELS[type(obj)], 'entity_id': inspect(obj).identity[0],
+                 'deleted_at': deleted_at}
+                for obj in session.deleted if type(obj) in SYNC_MODELS]
+        if rows:
+            session.connection().execute(insert(SyncTombstone), rows)
+
+
+def _sources():
+    """(раздел ответа, запрос, колонка времени, ключ) для каждого источника изменений"""
+    return (
+        ('employees', Employee.query, Employee.updated_at, Employee.employee_id),
+        ('contracts', Contract.query.options(joinedload(Contract.employee)),
+         Contract.updated_at, Contract.contract_id),
+        ('vacations', Vacation.query.options(joinedload(Vacation.employee)),
+         Vacation.updated_at, Vacation.vacation_id),
+        ('deleted', SyncTombstone.query, SyncTombstone.deleted_at, SyncTombstone.tombstone_id),
+    )
+
+
+def _moment(section, row):
+    return row.deleted_at if section == 'deleted' else row.updated_at
+
+
+def changes(since, limit):
+    """
+    Изменения после курсора since, не более limit записей (кроме строк
+    с одинаковым временем на границе страницы - они отдаются целиком).
+    Каждый источник читается по индексу на колонке времени: один запрос
+    с LIMIT limit + 1 на источник, затем слияние по времени.
+    """
+    now = datetime.now()
+    if since is not None and since < now - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise CursorExpired("Курсор устарел, нужна полная синхронизация")
+    until = now - timedelta(seconds=SYNC_SAFETY_SECONDS)
+    if since is not None and since >= until:
+        return _response({}, since, False)
+
+    merged = []
+    for section, query, moment, key in _sources():
+        query = query.filter(moment <= until)
+        if since is not None:
+            query = query.filter(moment > since)
+        merged += [(section, row) for row in query.order_by(moment, key).limit(limit + 1)]
+    merged.sort(key=lambda item: _moment(*item))
+
+    has_more = len(merged) > limit
+    if not has_more:
+        return _response(_group(merged), until, False)
+
+    # Первая не вошедшая строка задает границу: берем все строки строго раньше нее.
+    # Все они гарантированно прочитаны, так как каждый источник вернул limit + 1 строк.
+    boundary = _moment(*merged[limit])
+    page = [item for item in merged if _moment(*item) < boundary]
+    if page:
+        return _response(_group(page), _moment(*page[-1]), True)
+
+    # Больше limit строк с одним и тем же временем (массовое обновление) - отдаем их все
+    page = []
+    for section, query, moment, key in _sources():
+        page += [(section, row) for row in query.filter(moment == boundary).order_by(key)]
+    return _response(_group(page), boundary, True)
+
+
+def _group(items):
+    grouped = {}
+    for section, row in items:
+        grouped.setdefault(section, []).append(row)
+    return grouped
+
+
+def _response(grouped, cursor, has_more):
+    deleted = {section: [] for section in SYNC_MODELS.values()}
+    for tombstone in grouped.get('deleted', []):
+        deleted[tombstone.entity].append(tombstone.entity_id)
+    return {
+        'employees': employees_projection_schema(EMPLOYEE_LIST_FIELDS).dump(grouped.get('employees', [])),
+        'contracts': contracts_schema.dump(grouped.get('contracts', [])),
+        'vacations': vacations_schema.dump(grouped.get('vacations', [])),
+        'deleted': deleted,
+        'cursor': encode_cursor(cursor),
+        'has_more': has_more,
+    }
+
+
+def prune_tombstones(retention_days=None):
+    """Удаляет отметки об удалении старше срока хранения; возвращает их число"""
+    cutoff = datetime.now() - timedelta(days=retention_days or TOMBSTONE_RETENTION_DAYS)
+    removed = SyncTombstone.query.filter(SyncTombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
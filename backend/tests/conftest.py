@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Модули backend лежат в одном каталоге и импортируются по имени, как в app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Конфигурация читается при импорте app, поэтому база задается заранее:
+# отдельный файл SQLite на прогон, без реплики
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='hr-tests-'), 'test.db')}"
+os.environ.pop('DATABASE_REPLICA_URL', None)
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Приложение на базе с синтетическими данными (loadtest.seed)"""
+    from app import app as flask_app
+    from models import db
+    import loadtest
+
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        loadtest.seed(departments=3, employees=40, vacations=2, contracts=2, work_days=5)
+    return flask_app
+
+
+@pytest.fixture(scope='session')
+def hr_headers(app):
+    from flask_jwt_extended import create_access_token
+    from models import Employee
+
+    with app.app_context():
+        hr = Employee.query.filter_by(role='hr').first()
+        token = create_access_token(identity=str(hr.employee_id), additional_claims={'role': 'hr'})
+    return {'Authorization': f'Bearer {token}'}
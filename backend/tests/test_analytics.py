@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from analytics import absence_calendar
+from models import db, Vacation
+
+
+def test_absence_calendar_counts_each_employee_once_per_day(app):
+    periods = [
+        (3, date(2100, 1, 1), date(2100, 1, 10)),
+        (3, date(2100, 1, 5), date(2100, 1, 12)),   # пересекается с предыдущим
+        (3, date(2100, 1, 13), date(2100, 1, 14)),  # продолжает без разрыва
+        (4, date(2100, 1, 5), date(2100, 1, 5)),
+        (4, date(2099, 12, 20), date(2100, 1, 2)),  # начинается до периода
+    ]
+    with app.app_context():
+        vacations = [Vacation(fk_employee=employee, start_date=start, end_date=end, status='Approved')
+                     for employee, start, end in periods]
+        db.session.add_all(vacations)
+        db.session.commit()
+        try:
+            calendar = absence_calendar(date(2100, 1, 1), date(2100, 1, 20))
+        finally:
+            for vacation in vacations:
+                db.session.delete(vacation)
+            db.session.commit()
+
+    expected = []
+    for offset in range(20):
+        day = date(2100, 1, 1) + timedelta(days=offset)
+        expected.append(len({employee for employee, start, end in periods if start <= day <= end}))
+    assert [entry['absent'] for entry in calendar['days']] == expected
+    assert calendar['peak']['absent'] == max(expected) == 2
+    assert calendar['vacations'] == len(periods)
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+import orjson
+import pytest
+
+pytest.importorskip('asgiref')
+pytest.importorskip('aiosqlite')
+
+
+async def _get(application, path, headers, query=b''):
+    """GET через ASGI-интерфейс приложения: (статус, заголовки, тело)"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': query, 'root_path': '',
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers.items()],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    start = next(message for message in messages if message['type'] == 'http.response.start')
+    body = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    return start['status'], dict(start['headers']), body
+
+
+async def _shutdown(application):
+    """lifespan.shutdown закрывает асинхронные движки в том же цикле событий"""
+    events = iter([{'type': 'lifespan.shutdown'}])
+
+    async def receive():
+        return next(events)
+
+    async def send(message):
+        pass
+
+    await application({'type': 'lifespan'}, receive, send)
+
+
+def test_hybrid_application_serves_async_and_wsgi_routes(app, hr_headers, monkeypatch):
+    import asgi
+    import token_cache
+
+    # Время отзыва читается из базы заново: проверяем, в каком потоке идет запрос
+    lookups = []
+    load_valid_after = token_cache._load_valid_after
+
+    def recording_load(subject):
+        lookups.append(threading.get_ident())
+        return load_valid_after(subject)
+
+    monkeypatch.setattr(token_cache, '_load_valid_after', recording_load)
+    token_cache._valid_after.clear()
+    token_cache.token_cache.clear()
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+        # Асинхронный маршрут (ASYNC_ROUTES)
+        status, headers, body = await _get(asgi.application, '/employees', hr_headers, b'limit=5')
+        assert status == 200
+        assert len(orjson.loads(body)) == 5
+        assert b'x-next-cursor' in headers
+        # Маршрут без асинхронного обработчика передается Flask через WsgiToAsgi
+        status, _, body = await _get(asgi.application, '/employees/1', hr_headers)
+        assert status == 200
+        assert orjson.loads(body)['employee_id'] == 1
+        await _shutdown(asgi.application)
+        return loop_thread
+
+    loop_thread = asyncio.run(scenario())
+    assert lookups, "время отзыва не запрашивалось"
+    # Запрос к базе при проверке токена не должен выполняться в потоке цикла событий
+    assert loop_thread not in lookups
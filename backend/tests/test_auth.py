@@ -0,0 +1,26 @@
+import logging
+
+import loadtest
+
+NEW_PASSWORD = 'Нов0е-секретное-значение'
+
+
+def test_login_and_set_password_do_not_log_secrets(app, hr_headers, capsys, caplog):
+    client = app.test_client()
+    caplog.set_level(logging.DEBUG)
+
+    response = client.post('/auth/set-password/2', json={'password': NEW_PASSWORD}, headers=hr_headers)
+    assert response.status_code == 200
+    response = client.post('/auth/login', json={'email': loadtest.BENCH_EMPLOYEE_EMAIL, 'password': NEW_PASSWORD})
+    assert response.status_code == 200
+    token = response.get_json()['access_token']
+    response = client.post('/auth/login', json={'email': loadtest.BENCH_EMPLOYEE_EMAIL, 'password': 'wrong-secret'})
+    assert response.status_code == 401
+
+    output = capsys.readouterr()
+    logged = output.out + output.err + caplog.text
+    for secret in (NEW_PASSWORD, 'wrong-secret', token[:20], loadtest.BENCH_EMPLOYEE_EMAIL):
+        assert secret not in logged
+
+    # Остальные тесты входят с паролем из loadtest
+    client.post('/auth/set-password/2', json={'password': loadtest.BENCH_PASSWORD}, headers=hr_headers)
@@ -0,0 +1,10 @@
+import versions
+
+SEEDED_TABLES = ('departments', 'employees', 'vacations', 'contracts', 'work_hours',
+                 'work_hours_daily', 'work_hours_monthly')
+
+
+def test_seed_bumps_data_versions(app):
+    # ETag и ключ кэша дашборда после bench-seed не должны совпадать с пустой базой
+    with app.app_context():
+        assert all(version > 0 for version in versions.current(*SEEDED_TABLES))
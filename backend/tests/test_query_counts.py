@@ -0,0 +1,11 @@
+from models import db
+from querycount import LIST_ENDPOINT_QUERY_LIMIT, measure_list_endpoints
+
+
+def test_list_endpoints_within_query_budget(app, hr_headers):
+    # То же, что flask check-query-counts: рост числа запросов означает N+1
+    with app.app_context():
+        results = measure_list_endpoints(app, list(db.engines.values()), hr_headers)
+    failed = [(path, status, count) for path, status, count in results
+              if status != 200 or count > LIST_ENDPOINT_QUERY_LIMIT]
+    assert not failed, f"лимит {LIST_ENDPOINT_QUERY_LIMIT} запросов: {failed}"
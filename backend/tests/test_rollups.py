@@ -0,0 +1,36 @@
+from datetime import date
+
+import rollups
+from models import db, WorkHourDaily, WorkHourMonthly
+
+
+def _averages(query):
+    return sorted((row.name, round(float(row.hours_sum) / row.entries, 1)) for row in query.all() if row.entries)
+
+
+def _as_rows(result):
+    return sorted((item['department'], item['average_hours']) for item in result)
+
+
+def test_average_hours_matches_live_aggregate(app):
+    with app.app_context():
+        assert rollups.rollups_built()
+        assert _as_rows(rollups.average_hours_per_department()) == _averages(rollups.live_average_hours_query())
+
+
+def test_average_hours_falls_back_until_backfill(app):
+    # Существующая база до backfill-rollups: итоги пусты, ответ считается по work_hours
+    with app.app_context():
+        live = _averages(rollups.live_average_hours_query())
+        assert live
+        try:
+            for model in (WorkHourDaily, WorkHourMonthly):
+                db.session.query(model).delete()
+            rollups._built_engines.clear()
+            assert not rollups.rollups_built()
+            assert _as_rows(rollups.average_hours_per_department()) == live
+            assert _as_rows(rollups.average_hours_per_department(date(2000, 1, 1), date(2999, 12, 31))) == live
+        finally:
+            db.session.rollback()
+            rollups._built_engines.clear()
+        assert rollups.rollups_built()
@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import select
+from models import db, Employee
+
+
+class VerifiedTokenCache:
+    """
+    LRU-кэш уже проверенных JWT: sha256 токена -> claims.
+    Запись живет не дольше срока действия токена (claim exp), поэтому
+    повторные запросы с тем же токеном обходятся без проверки подписи.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._by_subject = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        key = self.digest(token)
+        with self._lock:
+            claims = self._data.get(key)
+            if claims is None:
+                self.misses += 1
+                return None
+            if claims.get('exp', 0) <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, token, claims):
+        key = self.digest(token)
+        subject = str(claims.get('sub'))
+        with self._lock:
+            self._data[key] = claims
+            self._data.move_to_end(key)
+            self._by_subject.setdefault(subject, set()).add(key)
+            while len(self._data) > self.maxsize:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+
+    def invalidate_subject(self, subject):
+        """Удаляет из кэша все токены сотрудника"""
+        with self._lock:
+            for key in self._by_subject.pop(str(subject), set()):
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_subject.clear()
+
+    def _remove(self, key):
+        claims = self._data.pop(key, None)
+        if claims is not None:
+            keys = self._by_subject.get(str(claims.get('sub')))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_subject[str(claims.get('sub'))]
+
+
+token_cache = VerifiedTokenCache()
+
+# Отзыв токенов: токены, выпущенные раньше employees.tokens_valid_after, недействительны.
+# Время хранится в базе и одинаково для всех воркеров; каждый процесс кэширует его
+# на REVOCATION_CACHE_SECONDS, поэтому отзыв, сделанный в другом воркере, начинает
+# действовать здесь не позже чем через это время.
+REVOCATION_CACHE_SECONDS = 5
+
+_valid_after = {}
+_revoked_lock = threading.Lock()
+
+
+def configure_revocation(cache_seconds):
+    global REVOCATION_CACHE_SECONDS
+    REVOCATION_CACHE_SECONDS = cache_seconds
+
+
+def revoke_employee_tokens(employee_id):
+    """
+    Сбрасывает кэши этого процесса для сотрудника после commit, в котором
+    изменился tokens_valid_after (деактивация, смена пароля)
+    """
+    with _revoked_lock:
+        _valid_after.pop(str(employee_id), None)
+    token_cache.invalidate_subject(employee_id)
+
+
+def _load_valid_after(subject):
+    """Время отзыва из основной базы: None - не отзывались, 'missing' - сотрудника нет"""
+    try:
+        employee_id = int(subject)
+    except (TypeError, ValueError):
+        return 'missing'
+    with db.engine.connect() as connection:
+        row = connection.execute(
+            select(Employee.tokens_valid_after).where(Employee.employee_id == employee_id)
+        ).first()
+    if row is None:
+        return 'missing'
+    return row.tokens_valid_after.timestamp() if row.tokens_valid_after else None
+
+
+def is_revoked(claims):
+    subject = str(claims.get('sub'))
+    now = time.monotonic()
+    with _revoked_lock:
+        cached = _valid_after.get(subject)
+    if cached is None or cached[0] <= now:
+        cached = (now + REVOCATION_CACHE_SECONDS, _load_valid_after(subject))
+        with _revoked_lock:
+            _valid_after[subject] = cached
+    valid_after = cached[1]
+    if valid_after == 'missing':
+        return True
+    # iat хранится с точностью до секунды: токен, выпущенный в ту же секунду,
+    # что и отзыв (например, вход сразу после смены пароля), считается действительным
+    return valid_after is not None and claims.get('iat', 0) < int(valid_after)
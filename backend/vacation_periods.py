@@ -0,0 +1,145 @@
+from datetime import date
+from sqlalchemy import select
+from models import db, Employee, Vacation
+
+# Отпуска, которые занимают дни: отклоненные не учитываются
+ACTIVE_STATUSES = ('Pending', 'Approved')
+
+# Положенное число календарных дней отпуска в году (0 - не проверять)
+VACATION_DAYS_PER_YEAR = 28
+
+
+class VacationConflict(Exception):
+    """Заявка пересекается с другими отпусками или превышает остаток дней"""
+
+    def __init__(self, message, conflicts=None, balance=None):
+        super().__init__(message)
+        self.conflicts = conflicts or []
+        self.balance = balance
+
+
+def overlapping_query(employee_id, start_date, end_date, exclude_id=None):
+    """
+    Запрос отпусков сотрудника в статусах ACTIVE_STATUSES, пересекающихся с периодом.
+    Условие start <= end_date AND end >= start_date проверяется по индексу
+    (fk_employee, start_date, end_date): читаются только отпуска этого
+    сотрудника, начавшиеся не позже конца периода.
+    """
+    query = Vacation.query.filter(
+        Vacation.fk_employee == employee_id,
+        Vacation.start_date <= end_date,
+        Vacation.end_date >= start_date,
+        Vacation.status.in_(ACTIVE_STATUSES),
+    )
+    if exclude_id is not None:
+        query = query.filter(Vacation.vacation_id != exclude_id)
+    return query.order_by(Vacation.start_date)
+
+
+def overlapping(employee_id, start_date, end_date, exclude_id=None):
+    """Отпуска сотрудника, пересекающиеся с периодом (см. overlapping_query)"""
+    return overlapping_query(employee_id, start_date, end_date, exclude_id).all()
+
+
+def _days_in_year(start_date, end_date, year):
+    first = max(start_date, date(year, 1, 1))
+    last = min(end_date, date(year, 12, 31))
+    return max((last - first).days + 1, 0)
+
+
+def used_days(employee_id, years, exclude_id=None):
+    """Число дней в отпусках ACTIVE_STATUSES по каждому году из years"""
+    years = sorted(years)
+    query = select(Vacation.start_date, Vacation.end_date).where(
+        Vacation.fk_employee == employee_id,
+        Vacation.start_date <= date(years[-1], 12, 31),
+        Vacation.end_date >= date(years[0], 1, 1),
+        Vacation.status.in_(ACTIVE_STATUSES),
+    )
+    if exclude_id is not None:
+        query = query.where(Vacation.vacation_id != exclude_id)
+    periods = db.session.execute(query).all()
+    return {year: sum(_days_in_year(start, end, year) for start, end in periods) for year in years}
+
+
+def check_request(employee_id, start_date, end_date, exclude_id=None):
+    """
+    Проверяет заявку на отпуск: период корректен, не пересекается с другими
+    отпусками сотрудника и укладывается в годовой остаток дней.
+    Выбрасывает ValueError для некорректного периода и VacationConflict для конфликта.
+    """
+    if end_date < start_date:
+        raise ValueError("Дата окончания раньше даты начала")
+
+    conflicts = overlapping(employee_id, start_date, end_date, exclude_id)
+    if conflicts:
+        raise VacationConflict("Отпуск пересекается с другими отпусками сотрудника", conflicts=conflicts)
+
+    if VACATION_DAYS_PER_YEAR:
+        years = range(start_date.year, end_date.year + 1)
+        used = used_days(employee_id, years, exclude_id)
+        for year in years:
+            requested = _days_in_year(start_date, end_date, year)
+            if used[year] + requested > VACATION_DAYS_PER_YEAR:
+                raise VacationConflict(
+                    f"Недостаточно дней отпуска за {year} год",
+                    balance={
+                        'year': year,
+                        'entitlement': VACATION_DAYS_PER_YEAR,
+                        'used': used[year],
+                        'requested': requested,
+                        'remaining': max(VACATION_DAYS_PER_YEAR - used[year], 0),
+                    },
+                )
+
+
+def absent_query(date_from, date_to=None, department=None, statuses=('Approved',)):
+    """
+    Запрос отпусков на дату date_from или в диапазоне [date_from, date_to].
+    Отбор идет по индексу (end_date, start_date): с end_date >= date_from
+    просматриваются только текущие и будущие отпуска, а не вся история.
+    """
+    date_to = date_to or date_from
+    query = db.session.query(Vacation, Employee).join(
+        Employee, Employee.employee_id == Vacation.fk_employee
+    ).filter(
+        Vacation.end_date >= date_from,
+        Vacation.start_date <= date_to,
+        Vacation.status.in_(statuses),
+    )
+    if department is not None:
+        query = query.filter(Employee.fk_department == department)
+    return query.order_by(Vacation.start_date, Vacation.vacation_id)
+
+
+def absent(date_from, date_to=None, department=None, statuses=('Approved',)):
+    """Кто в отпуске: список (Vacation, Employee), упорядоченный по дате начала"""
+    return absent_query(date_from, date_to, department, statuses).all()
+
+
+def absence_entry(vacation, employee, date_from, date_to):
+    """Строка ответа: сотрудник, период отпуска и число дней внутри диапазона"""
+    first = max(vacation.start_date, date_from)
+    last = min(vacation.end_date, date_to)
+    return {
+        'vacation_id': vacation.vacation_id,
+        'employee_id': employee.employee_id,
+        'first_name': employee.first_name,
+        'last_name': employee.last_name,
+        'job_name': employee.job_name,
+        'fk_department': employee.fk_department,
+        'start_date': vacation.start_date.isoformat(),
+        'end_date': vacation.end_date.isoformat(),
+        'status': vacation.status,
+        'days_in_range': (last - first).days + 1,
+    }
+
+
+# Поля чужих отсутствий, которые видит не-HR: кто и когда отсутствует, без деталей заявки
+COLLEAGUE_ABSENCE_FIELDS = ('employee_id', 'first_name', 'last_name', 'fk_department',
+                            'start_date', 'end_date', 'days_in_range')
+
+
+def colleague_absence_entry(entry):
+    """Строка absence_entry, сокращенная до COLLEAGUE_ABSENCE_FIELDS"""
+    return {field: entry[field] for field in COLLEAGUE_ABSENCE_FIELDS}
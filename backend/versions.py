@@ -0,0 +1,106 @@
+from datetime import datetime
+from sqlalchemy import event, insert, select, update
+from models import db, DataVersion
+
+# Версии данных по таблицам (таблица data_versions).
+# Увеличиваются в той же транзакции, что и запись в таблицу, и используются
+# как часть ключа кэша и ETag: изменилась версия - кэш автоматически устарел.
+# Версии хранятся в базе, поэтому все воркеры видят одни и те же значения.
+
+
+def mark_changed(session, *tables):
+    """
+    Отмечает таблицы, измененные в обход событий ORM (Core INSERT/UPDATE):
+    их версии увеличатся при commit сессии
+    """
+    session.info.setdefault('changed_tables', set()).update(tables)
+
+
+def _write(connection, tables):
+    # Одним UPDATE в порядке ключа: транзакции блокируют строки версий в одном порядке
+    tables = sorted(tables)
+    now = datetime.now()
+    result = connection.execute(
+        update(DataVersion).where(DataVersion.table_name.in_(tables))
+        .values(version=DataVersion.version + 1, changed_at=now)
+    )
+    if result.rowcount < len(tables):
+        existing = set(connection.execute(
+            select(DataVersion.table_name).where(DataVersion.table_name.in_(tables))
+        ).scalars())
+        connection.execute(insert(DataVersion), [
+            {'table_name': table, 'version': 1, 'changed_at': now} for table in tables if table not in existing
+        ])
+
+
+def snapshot_statement(*tables):
+    """SELECT версий таблиц (для асинхронного выполнения, см. asgi.py)"""
+    return select(DataVersion.table_name, DataVersion.version, DataVersion.changed_at).where(
+        DataVersion.table_name.in_(tables)
+    )
+
+
+def from_rows(rows, tables):
+    """
+    Версии таблиц и время последнего изменения любой из них (epoch-секунды)
+    из строк snapshot_statement. Таблица без записи в data_versions не менялась: версия 0.
+    """
+    found = {row.table_name: row for row in rows}
+    table_versions = tuple(found[table].version if table in found else 0 for table in tables)
+    changed_at = max([int(row.changed_at.timestamp()) for row in found.values()], default=0)
+    return table_versions, changed_at
+
+
+def snapshot(*tables):
+    """Версии таблиц и время последнего изменения (чтение через сессию запроса)"""
+    return from_rows(db.session.execute(snapshot_statement(*tables)).all(), tables)
+
+
+def current(*tables):
+    """Кортеж текущих версий таблиц (подходит для ключа кэша)"""
+    return snapshot(*tables)[0]
+
+
+def _changed_tables(session):
+    tables = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            tables.add(table)
+    return tables
+
+
+@event.listens_for(DataVersion.__table__, 'after_create')
+def _seed_versions(target, connection, **kw):
+    """Строки версий для всех таблиц моделей создаются вместе с data_versions"""
+    now = datetime.now()
+    connection.execute(insert(DataVersion), [
+        {'table_name': table.name, 'version': 0, 'changed_at': now}
+        for table in db.metadata.sorted_tables if table is not DataVersion.__table__
+    ])
+
+
+def register_version_listeners(session):
+    """
+    Подписывает версии на flush и commit сессии SQLAlchemy.
+    Измененные таблицы собираются при каждом flush, а версии увеличиваются
+    непосредственно перед commit: строки версий блокируются только на время commit,
+    и чтение увидит новую версию вместе с новыми данными.
+    """
+    @event.listens_for(session, 'after_flush')
+    def after_flush(session, flush_context):
+        tables = _changed_tables(session)
+        if tables:
+            mark_changed(session, *tables)
+
+    @event.listens_for(session, 'before_commit')
+    def before_commit(session):
+        # Оставшиеся изменения сбрасываются сейчас, чтобы их таблицы попали в версии
+        session.flush()
+        tables = session.info.pop('changed_tables', None)
+        if tables:
+            _write(session.connection(), tables)
+
+    @event.listens_for(session, 'after_rollback')
+    def after_rollback(session):
+        session.info.pop('changed_tables', None)
@@ -0,0 +1,163 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects import mysql, sqlite
+from models import db, Employee, WorkHour
+from rollups import apply_increments, rebuild
+import versions
+
+# Сколько записей обрабатывается в одной транзакции
+WORK_HOURS_CHUNK_SIZE = 1000
+
+# Сколько ошибок возвращать в отчете (остальные только считаются)
+MAX_REPORTED_ERRORS = 100
+
+WORK_HOURS_FIELDS = ('fk_employee', 'work_date', 'hours_worked')
+
+
+def _iter_records(stream, mimetype):
+    """Построчно читает CSV или NDJSON из потока тела запроса"""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if mimetype == 'text/csv':
+        for line_number, record in enumerate(csv.DictReader(text), start=2):
+            yield line_number, record
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+
+
+def _validate(record):
+    """Приводит запись к (fk_employee, work_date, hours_worked) или выбрасывает ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError("Некорректная строка")
+    missing = [field for field in WORK_HOURS_FIELDS if record.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Отсутствуют поля: {', '.join(missing)}")
+    try:
+        employee_id = int(record['fk_employee'])
+    except (TypeError, ValueError):
+        raise ValueError("fk_employee должен быть числом")
+    try:
+        work_date = datetime.strptime(str(record['work_date']), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError("work_date должна быть в формате YYYY-MM-DD")
+    try:
+        hours = Decimal(str(record['hours_worked'])).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError("hours_worked должно быть числом")
+    if not 0 <= hours <= 24:
+        raise ValueError("hours_worked должно быть от 0 до 24")
+    return employee_id, work_date, hours
+
+
+def _upsert_statement(dialect):
+    table = WorkHour.__table__
+    if dialect == 'mysql':
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update(hours_worked=stmt.inserted.hours_worked)
+    stmt = sqlite.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=['fk_employee', 'work_date'],
+        set_={'hours_worked': stmt.excluded.hours_worked},
+    )
+
+
+class WorkHoursImport:
+    """Потоковая загрузка отработанных часов порциями с upsert по (сотрудник, дата)"""
+
+    def __init__(self, chunk_size=WORK_HOURS_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.rejected = 0
+        self.errors = []
+
+    def _reject(self, line_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': message})
+
+    def _flush(self, chunk):
+        """Записывает порцию одной транзакцией и обновляет итоги по часам"""
+        # Последняя запись за (сотрудник, день) в порции побеждает
+        latest = {}
+        for line_number, (employee_id, work_date, hours) in chunk:
+            latest[(employee_id, work_date)] = (line_number, hours)
+
+        employee_ids = {employee_id for employee_id, _ in latest}
+        known = set(db.session.execute(
+            select(Employee.employee_id).where(Employee.employee_id.in_(employee_ids))
+        ).scalars())
+        for (employee_id, _), (line_number, _) in list(latest.items()):
+            if employee_id not in known:
+                self._reject(line_number, f"Сотрудник {employee_id} не найден")
+        latest = {key: value for key, value in latest.items() if key[0] in known}
+        if not latest:
+            return
+
+        # Существующие значения нужны, чтобы отличить вставку от обновления для итогов
+        existing = {
+            (employee_id, work_date): hours
+            for employee_id, work_date, hours in db.session.execute(
+                select(WorkHour.fk_employee, WorkHour.work_date, WorkHour.hours_worked)
+                .where(tuple_(WorkHour.fk_employee, WorkHour.work_date).in_(list(latest)))
+            )
+        }
+
+        rows = [{'fk_employee': employee_id, 'work_date': work_date, 'hours_worked': hours}
+                for (employee_id, work_date), (_, hours) in latest.items()]
+        db.session.execute(_upsert_statement(db.engine.dialect.name), rows)
+
+        connection = db.session.connection()
+        added = [(e, d, h) for (e, d), (_, h) in latest.items() if (e, d) not in existing]
+        changed = [(e, d) for (e, d), (_, h) in latest.items()
+                   if (e, d) in existing and Decimal(str(existing[(e, d)])) != h]
+        apply_increments(connection, added)
+        if changed:
+            rebuild(connection, min(d for _, d in changed), max(d for _, d in changed),
+                    {e for e, _ in changed})
+        versions.mark_changed(db.session, 'work_hours', 'work_hours_daily', 'work_hours_monthly')
+        db.session.commit()
+
+        self.inserted += len(added)
+        self.updated += len(changed)
+        self.unchanged += len(latest) - len(added) - len(changed)
+
+    def run(self, stream, mimetype):
+        started = time.perf_counter()
+        chunk = []
+        for line_number, record in _iter_records(stream, mimetype):
+            self.received += 1
+            try:
+                chunk.append((line_number, _validate(record)))
+            except ValueError as e:
+                self._reject(line_number, str(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        if chunk:
+            self._flush(chunk)
+
+        elapsed = time.perf_counter() - started
+        return {
+            'received': self.received,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(self.received / elapsed, 1) if elapsed else 0,
+        }
@@ -0,0 +1,7 @@
+from app import app
+
+# Точка входа WSGI для продакшена (вместо app.run в режиме отладки):
+#   gunicorn -c gunicorn.conf.py wsgi:app
+# Асинхронный вариант для списков и аналитики - asgi.py.
+
+application = app
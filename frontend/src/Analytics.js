@@ -12,25 +12,13 @@ function Analytics() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        // Количество сотрудников в отделах
-        const deptCountResponse = await api.get('/analytics/department-count');
-        setDepartmentCount(deptCountResponse.data || []);
-
-        // Средний возраст
-        const ageResponse = await api.get('/analytics/average-age');
-        setAverageAge(ageResponse.data.average_age || 0);
-
-        // Текучесть
-        const churnResponse = await api.get('/analytics/churn-rate');
-        setChurnRate(churnResponse.data.churn_rate || 0);
-
-        // Средний стаж
-        const tenureResponse = await api.get('/analytics/average-tenure');
-        setAverageTenure(tenureResponse.data.average_tenure || 0);
-
-        // Среднее время работы по отделам
-        const hoursResponse = await api.get('/analytics/average-hours-per-department');
-        setAverageHours(hoursResponse.data || []);
+        // Все показатели одним запросом
+        const { data } = await api.get('/analytics/dashboard');
+        setDepartmentCount(data.department_count || []);
+        setAverageAge(data.average_age || 0);
+        setChurnRate(data.churn_rate || 0);
+        setAverageTenure(data.average_tenure || 0);
+        setAverageHours(data.average_hours_per_department || []);
       } catch (err) {
         console.error('Ошибка загрузки аналитики:', err);
         setError('Не удалось загрузить данные аналитики');
@@ -19,12 +19,21 @@ import {
   Tooltip,
   Checkbox,
   FormControlLabel,
+  Typography,
 } from '@mui/material';
 import EmployeeCard from './components/EmployeeCard';
-import { getEmployees, updateEmployee } from './utils/api';
+import { getEmployee, getEmployeesPage, searchEmployees, updateEmployee } from './utils/api';
+
+// Сотрудников на одной странице списка и поиска
+const PAGE_SIZE = 100;
+// Поля строки списка - те же, что отдает поиск (RESULT_FIELDS в employee_search.py)
+const LIST_FIELDS = 'employee_id,first_name,last_name,email,job_name,fk_department,active,gender,salary';
 
 function EmployeesList() {
   const [employees, setEmployees] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  // Сколько всего найдено поиском (null - показывается список без запроса)
+  const [searchTotal, setSearchTotal] = useState(null);
   const [selectedEmployee, setSelectedEmployee] = useState(null);
   const [searchQuery, setSearchQuery] = useState('');
   const [filterGender, setFilterGender] = useState('');
@@ -35,13 +44,55 @@ function EmployeesList() {
   const [sortDirection, setSortDirection] = useState('asc');
   const [showInactive, setShowInactive] = useState(false);
 
+  // Поиск и фильтры выполняются на сервере: с запросом - страницы /employees/search
+  // по релевантности, без запроса - страницы /employees по курсору
+  const loadPage = async (cursor) => {
+    const query = searchQuery.trim();
+    const params = {
+      limit: PAGE_SIZE,
+      ...(cursor ? { cursor } : {}),
+      ...(showInactive ? {} : { active: 'Yes' }),
+      ...(filterGender ? { gender: filterGender } : {}),
+      ...(filterSalaryMin ? { salary_min: filterSalaryMin } : {}),
+      ...(filterSalaryMax ? { salary_max: filterSalaryMax } : {})
+    };
+    if (query) {
+      const { results, total, nextCursor } = await searchEmployees(query, params);
+      return { rows: results, total, nextCursor };
+    }
+    const { employees, nextCursor } = await getEmployeesPage({ ...params, fields: LIST_FIELDS });
+    return { rows: employees, total: null, nextCursor };
+  };
+
+  // Первая страница загружается заново после паузы в наборе запроса или смене фильтров
   useEffect(() => {
-    fetchEmployees();
-  }, []);
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const page = await loadPage(null);
+        if (!cancelled) {
+          setEmployees(page.rows);
+          setSearchTotal(page.total);
+          setNextCursor(page.nextCursor);
+        }
+      } catch (error) {
+        console.error('Ошибка при загрузке сотрудников:', error);
+      }
+    }, 200);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery, showInactive, filterGender, filterSalaryMin, filterSalaryMax]);
 
-  const fetchEmployees = async () => {
-    const data = await getEmployees();
-    setEmployees(data);
+  const handleLoadMore = async () => {
+    try {
+      const page = await loadPage(nextCursor);
+      setEmployees((loaded) => [...loaded, ...page.rows]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Ошибка при загрузке сотрудников:', error);
+    }
   };
 
   const translateGender = (gender) => {
@@ -51,37 +102,12 @@ function EmployeesList() {
            gender;
   };
 
-  // Фильтрация сотрудников с учетом активности
-  const filteredEmployees = employees
-    .filter((employee) => {
-      // Фильтр по активности
-      const isActive = employee.active === 'Yes';
-      if (!showInactive && !isActive) {
-        return false;
-      }
-
-      // Поиск по строковому запросу
-      const matchesSearch =
-        Object.values(employee).some(
-          (value) =>
-            typeof value === 'string' &&
-            value.toLowerCase().includes(searchQuery.toLowerCase())
-        ) || searchQuery === '';
-
-      // Фильтр по полу
-      const matchesGender =
-        filterGender === '' || employee.gender === filterGender;
-
-      // Фильтр по зарплате
-      const salary = parseFloat(employee.salary);
-      const matchesSalary =
-        (!filterSalaryMin || salary >= parseFloat(filterSalaryMin)) &&
-        (!filterSalaryMax || salary <= parseFloat(filterSalaryMax));
-
-      return matchesSearch && matchesGender && matchesSalary;
-    })
+  // Строки уже отфильтрованы сервером; уволенный в карточке сотрудник скрывается сразу
+  const visibleEmployees = employees
+    .filter((employee) => showInactive || employee.active === 'Yes')
     .slice() // Копия массива для сортировки
     .sort((a, b) => {
+      // Без выбранной сортировки сохраняется порядок сервера (в поиске - по релевантности)
       if (!sortField) return 0;
 
       const valueA = a[sortField];
@@ -96,28 +122,40 @@ function EmployeesList() {
       return 0;
     });
 
-  const handleRowClick = (employee) => {
-    setSelectedEmployee(employee);
+  // Карточка открывается с полной записью: в списке и поиске нет ИНН и СНИЛС
+  const handleRowClick = async (employee) => {
+    try {
+      setSelectedEmployee(await getEmployee(employee.employee_id));
+    } catch (error) {
+      console.error('Ошибка при загрузке сотрудника:', error);
+    }
+  };
+
+  // После изменения обновляется только строка этого сотрудника, без перезагрузки списка
+  const refreshEmployee = async (employeeId) => {
+    const updated = await getEmployee(employeeId);
+    setEmployees((loaded) => loaded.map((employee) =>
+      employee.employee_id === employeeId ? { ...employee, ...updated } : employee
+    ));
   };
 
   const handleDismissEmployee = async (updatedEmployee) => {
     try {
       await updateEmployee(updatedEmployee.employee_id, updatedEmployee);
-      fetchEmployees();
+      await refreshEmployee(updatedEmployee.employee_id);
     } catch (error) {
       console.error('Ошибка при обновлении сотрудника:', error);
     }
   };
 
-  const handleCloseCard = async () => {
+  const handleCloseCard = () => {
     setSelectedEmployee(null);
-    await fetchEmployees();
   };
 
   const handleUpdateEmployee = async (updatedEmployee) => {
     try {
       await updateEmployee(updatedEmployee.employee_id, updatedEmployee);
-      fetchEmployees();
+      await refreshEmployee(updatedEmployee.employee_id);
     } catch (error) {
       console.error('Ошибка при обновлении сотрудника:', error);
     }
@@ -218,6 +256,12 @@ function EmployeesList() {
         </Box>
       </Collapse>
 
+      {searchTotal !== null && (
+        <Typography variant="body2" color="text.secondary" className="search-total">
+          Найдено: {searchTotal}
+        </Typography>
+      )}
+
       <Box className="table-container">
         <TableContainer component={Paper}>
           <Table className="employees-table" aria-label="simple table">
@@ -254,7 +298,7 @@ function EmployeesList() {
               </TableRow>
             </TableHead>
             <TableBody>
-              {filteredEmployees.map((employee) => (
+              {visibleEmployees.map((employee) => (
                 <TableRow
                   key={employee.employee_id}
                   onClick={() => handleRowClick(employee)}
@@ -273,6 +317,11 @@ function EmployeesList() {
             </TableBody>
           </Table>
         </TableContainer>
+        {nextCursor && (
+          <Button variant="outlined" onClick={handleLoadMore} className="load-more-btn">
+            Показать еще
+          </Button>
+        )}
       </Box>
 
       {selectedEmployee && (
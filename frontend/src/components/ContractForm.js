@@ -51,9 +51,11 @@ function ContractForm({ open, onClose, onSubmit }) {
   const fetchEmployees = async () => {
     setLoading(true);
     try {
-      const employeesData = await getEmployees();
-      // Фильтруем только активных сотрудников
-      const activeEmployees = employeesData.filter(emp => emp.active === 'Yes');
+      // Только активные сотрудники и только нужные для выбора поля
+      const activeEmployees = await getEmployees({
+        active: 'Yes',
+        fields: 'employee_id,first_name,last_name,job_name,active'
+      });
       setEmployees(activeEmployees);
     } catch (error) {
       console.error('Ошибка при загрузке сотрудников:', error);
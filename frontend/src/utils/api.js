@@ -4,8 +4,11 @@ import axios from 'axios';
 const API_URL = 'http://localhost:5000';
 
 // Создаем экземпляр axios
+// withCredentials: после записи сервер ставит cookie, по которой следующие
+// чтения этого клиента идут на основную базу, а не на отстающую реплику
 const api = axios.create({
-  baseURL: API_URL
+  baseURL: API_URL,
+  withCredentials: true
 });
 
 // Перехватчик для добавления токена к запросам
@@ -49,11 +52,46 @@ export const getCurrentUser = async () => {
 };
 
 // Получение списка сотрудников (используем api с JWT)
-export const getEmployees = async () => {
-  const response = await api.get(`/employees`);
+// Сервер отдает список постранично: курсор следующей страницы приходит в заголовке X-Next-Cursor
+export const getEmployees = async (params = {}) => {
+  const employees = [];
+  let cursor = null;
+  do {
+    const response = await api.get(`/employees`, {
+      params: { limit: 1000, ...params, ...(cursor ? { cursor } : {}) }
+    });
+    employees.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return employees;
+};
+
+// Одна страница списка сотрудников: params - limit, cursor и фильтры /employees.
+// nextCursor - курсор следующей страницы (null, если страница последняя)
+export const getEmployeesPage = async (params = {}) => {
+  const response = await api.get(`/employees`, { params });
+  return { employees: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+};
+
+// Полная карточка сотрудника (с ИНН и СНИЛС, которых нет в списке и поиске)
+export const getEmployee = async (id) => {
+  const response = await api.get(`/employees/${id}`);
   return response.data;
 };
 
+// Одна страница поиска сотрудников по началу имени, фамилии, email или должности.
+// Результаты упорядочены по релевантности; params - limit, cursor и фильтры
+// (department, active, gender, salary_min, salary_max).
+// total - сколько всего найдено, nextCursor - курсор следующей страницы
+export const searchEmployees = async (q, params = {}) => {
+  const response = await api.get('/employees/search', { params: { q, ...params } });
+  return {
+    results: response.data,
+    total: Number(response.headers['x-total-count']) || 0,
+    nextCursor: response.headers['x-next-cursor'] || null
+  };
+};
+
 // Добавление нового сотрудника
 export const addEmployee = async (data) => {
   await api.post(`/employees`, data);
@@ -141,6 +179,12 @@ export const getContracts = async () => {
   return response.data;
 };
 
+// Контракты с уведомлением о продлении или окончанием в ближайшие within (30d, 4w)
+export const getExpiringContracts = async (within = '30d') => {
+  const response = await api.get('/contracts/expiring', { params: { within } });
+  return response.data;
+};
+
 export const addContract = async (contractData) => {
   const response = await api.post('/contracts', contractData);
   return response.data;
@@ -156,6 +200,14 @@ export const deleteContract = async (contractId) => {
   return response.data;
 };
 
+// Пакет операций HR в одной транзакции (статусы отпусков, контракты, деактивация).
+// operations: [{ op: 'vacation_status', id, status }, { op: 'contract_update', id, ... },
+// { op: 'deactivate_employee', id }]; atomic - применить все или ничего
+export const runBatch = async (operations, atomic = false) => {
+  const response = await api.post('/batch', { operations, atomic });
+  return response.data;
+};
+
 // Установка пароля (только для HR)
 export const setPassword = async (employeeId, password) => {
   const response = await api.post(`/auth/set-password/${employeeId}`, { password });